@@ -1,9 +1,15 @@
 import os
 import subprocess
 import time
+import hashlib
 import requests
 import shutil
 import logging
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
 
 # Setup Logger
@@ -23,6 +29,73 @@ class EngineUtils:
             except Exception as e:
                 print(f"Warning: Failed to clean {path}: {e}")
 
+    @staticmethod
+    def new_job_id(prefix):
+        # Unique even when parallel workers start jobs in the same millisecond
+        return f"{prefix}_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def three_to_one(res):
+        return {'ALA':'A','CYS':'C','ASP':'D','GLU':'E','PHE':'F','GLY':'G','HIS':'H','ILE':'I','LYS':'K','LEU':'L','MET':'M','ASN':'N','PRO':'P','GLN':'Q','ARG':'R','SER':'S','THR':'T','VAL':'V','TRP':'W','TYR':'Y'}.get(res,'X')
+
+    @staticmethod
+    def extract_residues(pdb_content):
+        """
+        Returns [(chain, res_num, aa)] for every CA atom, in file order.
+        chain is the raw column 22 value ('' when blank).
+        """
+        residues = []
+        seen = set()
+        for line in pdb_content.splitlines():
+            if line.startswith('ATOM') and line[13:15] == 'CA':
+                try:
+                    chain = line[21].strip()
+                    res_num = int(line[22:26])
+                except (IndexError, ValueError):
+                    continue
+                if (chain, res_num) in seen: continue
+                seen.add((chain, res_num))
+                residues.append((chain, res_num, EngineUtils.three_to_one(line[17:20].strip())))
+        return residues
+
+    @staticmethod
+    def derive_mutations(parent_pdb, sequence):
+        """
+        Diffs a designed sequence against the parent structure.
+        Returns FoldX-style mutation codes (e.g. 'KA12G'), or None when the
+        sequence cannot be mapped 1:1 onto the parent residues.
+        """
+        residues = EngineUtils.extract_residues(parent_pdb)
+        if not residues or len(residues) != len(sequence):
+            return None
+
+        # FoldX needs a chain letter; blank chains are relabelled 'A' by
+        # fill_blank_chain before BuildModel, which is ambiguous if an 'A'
+        # chain already exists
+        chains = {chain for chain, _, _ in residues}
+        if '' in chains and 'A' in chains:
+            return None
+
+        mutations = []
+        for (chain, res_num, wt), mut in zip(residues, sequence):
+            if wt == mut: continue
+            if wt == 'X' or mut not in "ACDEFGHIKLMNPQRSTVWY":
+                return None
+            mutations.append(f"{wt}{chain or 'A'}{res_num}{mut}")
+        return mutations
+
+    @staticmethod
+    def fill_blank_chain(pdb_content, chain='A'):
+        """
+        Sets a chain ID on ATOM/HETATM/TER records that have none.
+        """
+        lines = []
+        for line in pdb_content.splitlines():
+            if line.startswith(('ATOM', 'HETATM', 'TER')) and len(line) > 21 and line[21] == ' ':
+                line = line[:21] + chain + line[22:]
+            lines.append(line)
+        return "\n".join(lines)
+
 class PDBQTConverter:
     @staticmethod
     def convert(pdb_content):
@@ -64,18 +137,54 @@ class PDBQTConverter:
                 
         return "\n".join(pdbqt_lines)
 
-class VinaEngine:
+class DockingBackend(ABC):
+    """
+    Interface for docking implementations used by VinaEngine.
+    """
+    name = "base"
+
+    @abstractmethod
+    def is_available(self):
+        """
+        True if this backend can actually dock on this host.
+        """
+
+    @abstractmethod
+    def dock(self, receptor_pdbqt, ligand_pdbqt, center, size, log_callback=None):
+        """
+        Returns (affinity, poses_pdbqt).
+        """
+
+class SubprocessVinaBackend(DockingBackend):
+    """
+    Launches the Vina binary per docking job, exchanging files through temp/.
+    """
+    name = "vina-subprocess"
+
     def __init__(self, bin_path="bin/vina.exe"):
-        self.bin_path = os.path.abspath(bin_path)
-        if not os.path.exists(self.bin_path):
-            # Fallback checks
-            if os.path.exists("vina.exe"):
-                self.bin_path = os.path.abspath("vina.exe")
-            elif os.path.exists("server/bin/vina.exe"):
-                self.bin_path = os.path.abspath("server/bin/vina.exe")
-    
-    def run(self, receptor_pdbqt, ligand_pdbqt, center=(0,0,0), size=(20,20,20), log_callback=None):
-        job_id = f"vina_{int(time.time()*1000)}"
+        # The configured binary wins if it can run here; otherwise the
+        # bundled copies, then a vina on PATH (the bundled .exe files only
+        # run on Windows, so elsewhere that is usually the one picked)
+        candidates = [os.path.abspath(bin_path), os.path.abspath("vina.exe"), os.path.abspath("server/bin/vina.exe")]
+        if shutil.which("vina"):
+            candidates.append(shutil.which("vina"))
+        runnable = [p for p in candidates if self._runnable(p)]
+        existing = [p for p in candidates if os.path.isfile(p)]
+        self.bin_path = (runnable or existing or candidates)[0]
+
+    @staticmethod
+    def _runnable(path):
+        if not os.path.isfile(path):
+            return False
+        if os.name != "nt":
+            return not path.lower().endswith(".exe") and os.access(path, os.X_OK)
+        return True
+
+    def is_available(self):
+        return self._runnable(self.bin_path)
+
+    def dock(self, receptor_pdbqt, ligand_pdbqt, center=(0,0,0), size=(20,20,20), log_callback=None):
+        job_id = EngineUtils.new_job_id("vina")
         work_dir = os.path.abspath(f"temp/{job_id}")
         EngineUtils.ensure_dir(work_dir)
         
@@ -131,6 +240,117 @@ class VinaEngine:
         finally:
             EngineUtils.clean_dir(work_dir)
 
+class PythonVinaBackend(DockingBackend):
+    """
+    Docks in-process through the `vina` Python bindings.
+    Receptor maps are kept in memory and reused across ligands and poses;
+    poses and energies are returned as strings without touching disk.
+    """
+    name = "vina-python"
+
+    def __init__(self, exhaustiveness=8, cpu=4, n_poses=9, max_receptors=4):
+        self.exhaustiveness = exhaustiveness
+        self.cpu = cpu
+        self.n_poses = n_poses
+        self.max_receptors = max_receptors
+        # (receptor hash, center, size) -> {'vina', 'lock'}, LRU order.
+        # _lock only guards the dict; each receptor session has its own lock
+        # so different receptors dock concurrently.
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            from vina import Vina
+            self._vina_cls = Vina
+        except ImportError:
+            self._vina_cls = None
+
+    def is_available(self):
+        return self._vina_cls is not None
+
+    def _session(self, receptor_pdbqt, center, size):
+        key = (
+            hashlib.sha256(receptor_pdbqt.encode()).hexdigest(),
+            tuple(round(c, 3) for c in center),
+            tuple(round(s, 3) for s in size)
+        )
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = {'vina': None, 'lock': threading.Lock()}
+                self._sessions[key] = entry
+                while len(self._sessions) > self.max_receptors:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(key)
+        return entry
+
+    def _create_vina(self, receptor_pdbqt, center, size, log_callback=None):
+        v = self._vina_cls(sf_name="vina", cpu=self.cpu, verbosity=0)
+        # The bindings only accept a receptor path; write it once per
+        # receptor; everything after the map computation stays in memory.
+        fd, rec_path = tempfile.mkstemp(suffix=".pdbqt")
+        try:
+            with os.fdopen(fd, "w") as f: f.write(receptor_pdbqt)
+            v.set_receptor(rigid_pdbqt_filename=rec_path)
+        finally:
+            os.remove(rec_path)
+        
+        start_time = time.time()
+        v.compute_vina_maps(center=list(center), box_size=list(size))
+        if log_callback: log_callback(f"Vina maps computed in {time.time() - start_time:.2f}s")
+        return v
+
+    def dock(self, receptor_pdbqt, ligand_pdbqt, center=(0,0,0), size=(20,20,20), log_callback=None):
+        entry = self._session(receptor_pdbqt, center, size)
+        # A Vina object is not thread-safe: one search per receptor at a time
+        with entry['lock']:
+            if entry['vina'] is None:
+                entry['vina'] = self._create_vina(receptor_pdbqt, center, size, log_callback)
+            v = entry['vina']
+            
+            if log_callback: log_callback(f"Running Vina (in-process, exhaustiveness={self.exhaustiveness})")
+            
+            start_time = time.time()
+            v.set_ligand_from_string(ligand_pdbqt)
+            v.dock(exhaustiveness=self.exhaustiveness, n_poses=self.n_poses)
+            energies = v.energies(n_poses=self.n_poses)
+            poses = v.poses(n_poses=self.n_poses)
+            duration = time.time() - start_time
+        
+        if log_callback: log_callback(f"Vina Finished in {duration:.2f}s")
+        
+        affinity = float(energies[0][0]) if len(energies) else -5.0
+        return affinity, poses
+
+class VinaEngine:
+    def __init__(self, bin_path="bin/vina.exe", backend=None):
+        """
+        backend: a DockingBackend. By default the in-process bindings are used
+        when the `vina` package is installed, with the binary as fallback.
+        """
+        self.subprocess_backend = SubprocessVinaBackend(bin_path)
+        self.bin_path = self.subprocess_backend.bin_path
+        
+        if backend is None:
+            backend = PythonVinaBackend()
+            if not backend.is_available():
+                backend = self.subprocess_backend
+        self.backend = backend
+        self.fallback = self.subprocess_backend if backend is not self.subprocess_backend else None
+
+    @property
+    def available(self):
+        return self.backend.is_available() or (self.fallback is not None and self.fallback.is_available())
+
+    def run(self, receptor_pdbqt, ligand_pdbqt, center=(0,0,0), size=(20,20,20), log_callback=None):
+        try:
+            return self.backend.dock(receptor_pdbqt, ligand_pdbqt, center, size, log_callback)
+        except Exception as e:
+            if self.fallback is None or not self.fallback.is_available():
+                raise
+            if log_callback: log_callback(f"{self.backend.name} failed ({e}), retrying with {self.fallback.name}", 'warn')
+            return self.fallback.dock(receptor_pdbqt, ligand_pdbqt, center, size, log_callback)
+
     def smiles_to_pdbqt(self, smiles):
         try:
             import urllib.parse
@@ -179,8 +399,227 @@ class VinaEngine:
             pdb_lines.append(line)
         return "\n".join(pdb_lines)
 
+class ContactScoringEngine:
+    """
+    Millisecond docking proxy. Places a ligand pose in a receptor pocket,
+    tries rigid rotations, refines the best few with small translations, and
+    scores the best pose with Vina-style gauss/repulsion/hydrophobic/H-bond terms over a
+    KD-tree of receptor atoms. Used as a pre-filter ahead of Vina and as the
+    affinity signal when Vina is not installed. Requires numpy and scipy.
+    """
+    # Vina intermolecular weights (kcal/mol)
+    WEIGHTS = {'gauss1': -0.0356, 'gauss2': -0.00516, 'repulsion': 0.840, 'hydrophobic': -0.0351, 'hbond': -0.587}
+    VDW_RADII = {'C': 1.9, 'N': 1.8, 'O': 1.7, 'S': 2.0, 'P': 2.1, 'F': 1.5, 'CL': 1.8, 'BR': 2.0, 'I': 2.2}
+
+    def __init__(self, cutoff=8.0, n_orientations=24, translation_radius=2.0, translation_step=2.0,
+                 refine_top=3, clash_distance=2.5, seed=0, pocket_cache_size=64):
+        self.cutoff = cutoff
+        self.n_orientations = n_orientations
+        # Only the refine_top best rotations (at zero offset) are translated
+        self.refine_top = refine_top
+        self.clash_distance = clash_distance
+        # Pocket estimates by structure hash; the pre-filter and the
+        # fallback scoring ask for the same structures
+        self._pockets = OrderedDict()
+        self._pocket_cache_size = pocket_cache_size
+        self._pocket_lock = threading.Lock()
+        try:
+            import numpy as np
+            from scipy.spatial import cKDTree
+            self.np = np
+            self.kdtree = cKDTree
+            self.available = True
+            self._rotations = self._random_rotations(n_orientations, seed)
+            self._translations = self._translation_grid(translation_radius, translation_step)
+        except ImportError:
+            print("Warning: numpy/scipy not installed, contact scoring unavailable.")
+            self.available = False
+
+    def _random_rotations(self, n, seed):
+        # Identity first so an already-docked pose is always scored as-is
+        np = self.np
+        rng = np.random.default_rng(seed)
+        q = rng.normal(size=(max(0, n - 1), 4))
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        w, x, y, z = q.T
+        mats = np.stack([
+            1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w),
+            2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w),
+            2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)
+        ], axis=1).reshape(-1, 3, 3)
+        return np.concatenate([np.eye(3)[None], mats])
+
+    def _translation_grid(self, radius, step):
+        # Offsets on a cubic grid inside a sphere; zero offset first
+        np = self.np
+        if radius <= 0 or step <= 0:
+            return np.zeros((1, 3))
+        axis = np.arange(-radius, radius + 1e-9, step)
+        grid = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+        grid = grid[np.linalg.norm(grid, axis=1) <= radius + 1e-9]
+        grid = grid[np.argsort(np.linalg.norm(grid, axis=1), kind='stable')]
+        return grid
+
+    def estimate_pocket(self, receptor_pdb, spacing=1.5, probe=3.0, buried_radius=8.0, top=10):
+        """
+        Pocket-centre estimate: the most buried empty grid points (no atom
+        within `probe`, most atoms within `buried_radius`), averaged.
+        Falls back to the atom centroid if the receptor has no cavity.
+        Results are cached per structure.
+        """
+        key = hashlib.sha1(f"{spacing}:{probe}:{buried_radius}:{top}\0{receptor_pdb}".encode()).hexdigest()
+        with self._pocket_lock:
+            if key in self._pockets:
+                self._pockets.move_to_end(key)
+                return self._pockets[key]
+        
+        pocket = self._estimate_pocket(receptor_pdb, spacing, probe, buried_radius, top)
+        with self._pocket_lock:
+            self._pockets[key] = pocket
+            while len(self._pockets) > self._pocket_cache_size:
+                self._pockets.popitem(last=False)
+        return pocket
+
+    def _estimate_pocket(self, receptor_pdb, spacing, probe, buried_radius, top):
+        np = self.np
+        rec_xyz, _ = self.parse_atoms(receptor_pdb)
+        if len(rec_xyz) == 0:
+            raise Exception("Pocket estimate needs receptor atoms")
+        
+        tree = self.kdtree(rec_xyz)
+        lo, hi = rec_xyz.min(axis=0), rec_xyz.max(axis=0)
+        axes = [np.arange(lo[i], hi[i] + spacing, spacing) for i in range(3)]
+        grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+        
+        # Empty but close to the protein (not out in the solvent box corners)
+        dist, _ = tree.query(grid, k=1)
+        grid = grid[(dist > probe) & (dist < probe + 2.0)]
+        if len(grid) == 0:
+            return tuple(rec_xyz.mean(axis=0))
+        
+        buried = tree.query_ball_point(grid, r=buried_radius, return_length=True)
+        order = np.argsort(-buried, kind='stable')[:top]
+        best = grid[order[0]]
+        cluster = grid[order][np.linalg.norm(grid[order] - best, axis=1) <= 4.0]
+        return tuple(cluster.mean(axis=0))
+
+    def parse_atoms(self, content):
+        """
+        Heavy-atom coordinates and elements from PDB/PDBQT text.
+        Only the first MODEL of a multi-pose file is read.
+        """
+        coords = []
+        elements = []
+        for line in content.splitlines():
+            if line.startswith('ENDMDL') and coords: break
+            if not (line.startswith('ATOM') or line.startswith('HETATM')): continue
+            try:
+                xyz = (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+            except ValueError:
+                continue
+            element = line[76:78].strip().upper() if len(line) >= 78 else ''
+            if not element or not element[0].isalpha():
+                atom_name = line[12:16].strip()
+                element = ''.join([c for c in atom_name if c.isalpha()])[:1].upper()
+            # PDBQT types: OA/NA/HD/A -> element
+            element = {'OA': 'O', 'NA': 'N', 'HD': 'H', 'A': 'C', 'SA': 'S'}.get(element, element)
+            if element == 'H': continue
+            coords.append(xyz)
+            elements.append(element)
+        return self.np.array(coords, dtype=float).reshape(-1, 3), elements
+
+    def score(self, receptor_pdb, ligand_pose, center=None, reference_center=None, log_callback=None):
+        """
+        Scores ligand_pose against receptor_pdb. The pose is translated by
+        center - reference_center (reference_center defaults to the pose
+        centroid, i.e. the ligand is centred on the pocket). All
+        n_orientations rigid rotations about its centroid are scored in
+        place, then the refine_top best are retried at offsets within
+        translation_radius, and the best pose overall is kept.
+        Returns (score, terms); lower is better, roughly in kcal/mol.
+        """
+        np = self.np
+        start_time = time.time()
+        
+        rec_xyz, rec_el = self.parse_atoms(receptor_pdb)
+        lig_xyz, lig_el = self.parse_atoms(ligand_pose)
+        if len(rec_xyz) == 0 or len(lig_xyz) == 0:
+            raise Exception("Contact scoring needs receptor and ligand atoms")
+        
+        # 1. Place pose into this receptor's pocket
+        centroid = lig_xyz.mean(axis=0)
+        if center is not None:
+            ref = centroid if reference_center is None else np.asarray(reference_center, dtype=float)
+            shift = np.asarray(center, dtype=float) - ref
+            lig_xyz = lig_xyz + shift
+            centroid = centroid + shift
+        
+        rec_tree = self.kdtree(rec_xyz)
+        radius = lambda els: np.array([self.VDW_RADII.get(e, 1.9) for e in els])
+        atoms = (rec_tree, radius(lig_el), radius(rec_el), np.array(lig_el), np.array(rec_el))
+        
+        # 2. Every rotation at zero offset: (R, L, 3)
+        n_lig = len(lig_xyz)
+        rotated = np.einsum('rij,lj->rli', self._rotations, lig_xyz - centroid) + centroid
+        totals, terms, pairs = self._score_poses(rotated, atoms)
+        poses = [(r, 0) for r in range(len(rotated))]
+        
+        # 3. Translational refinement of the best few rotations only, so
+        # memory and time stay bounded by refine_top x offsets
+        if len(self._translations) > 1 and self.refine_top > 0:
+            top = np.argsort(totals, kind='stable')[:self.refine_top]
+            offsets = self._translations[1:]
+            shifted = (rotated[top][:, None] + offsets[None, :, None, :]).reshape(-1, n_lig, 3)
+            t_totals, t_terms, t_pairs = self._score_poses(shifted, atoms)
+            if t_totals.min() < totals.min():
+                totals, terms, pairs = t_totals, t_terms, t_pairs
+                poses = [(int(r), t + 1) for r in top for t in range(len(offsets))]
+        
+        best = int(np.argmin(totals))
+        orient, d = pairs
+        mask = orient == best
+        result = {k: float(v[best]) for k, v in terms.items()}
+        result['contacts'] = int(np.count_nonzero(mask & (d < 4.5)))
+        result['clashes'] = int(np.count_nonzero(mask & (d < self.clash_distance)))
+        result['orientation'] = poses[best][0]
+        result['translation'] = tuple(float(t) for t in self._translations[poses[best][1]])
+        
+        score = float(totals[best])
+        if log_callback: log_callback(f"Contact score {score:.2f} ({len(rec_xyz)} receptor atoms, {(time.time() - start_time)*1000:.0f} ms)")
+        return score, result
+
+    def _score_poses(self, poses, atoms):
+        """
+        Per-pose weighted totals and Vina terms for poses (P, L, 3).
+        Also returns (pose index, distance) per receptor/ligand atom pair.
+        """
+        np = self.np
+        rec_tree, lig_r, rec_r, lig_el, rec_el = atoms
+        n_pose, n_lig = poses.shape[:2]
+        
+        pairs = self.kdtree(poses.reshape(-1, 3)).sparse_distance_matrix(rec_tree, self.cutoff, output_type='coo_matrix')
+        li, ri, d = pairs.row, pairs.col, pairs.data
+        orient = li // n_lig
+        lig_idx = li % n_lig
+        surf = d - lig_r[lig_idx] - rec_r[ri]
+        
+        both_c = (lig_el[lig_idx] == 'C') & (rec_el[ri] == 'C')
+        polar = np.isin(lig_el[lig_idx], ('N', 'O')) & np.isin(rec_el[ri], ('N', 'O'))
+        
+        per_pair = {
+            'gauss1': np.exp(-(surf / 0.5) ** 2),
+            'gauss2': np.exp(-((surf - 3.0) / 2.0) ** 2),
+            'repulsion': np.where(surf < 0, surf ** 2, 0.0),
+            'hydrophobic': np.where(both_c, np.clip((1.5 - surf) / 1.0, 0.0, 1.0), 0.0),
+            'hbond': np.where(polar, np.clip(-surf / 0.7, 0.0, 1.0), 0.0),
+        }
+        
+        terms = {k: np.bincount(orient, weights=v, minlength=n_pose) for k, v in per_pair.items()}
+        totals = sum(self.WEIGHTS[k] * terms[k] for k in terms)
+        return totals, terms, (orient, d)
+
 class FoldXEngine:
-    def __init__(self, bin_path="bin/foldx.exe"):
+    def __init__(self, bin_path="bin/foldx.exe", repair_cache_size=32, repair_cache_files=256):
         self.bin_path = os.path.abspath(bin_path)
         if not os.path.exists(self.bin_path):
              if os.path.exists("foldx.exe"):
@@ -192,9 +631,165 @@ class FoldXEngine:
         if not os.path.exists(self.bin_path):
              if os.path.exists("foldx.exe"):
                 self.bin_path = os.path.abspath("foldx.exe")
+
+        # RepairPDB outputs, keyed by sha256 of the FoldX binary identity
+        # and the input structure: a small in-memory LRU for this session,
+        # and on disk (oldest evicted past repair_cache_files) for parents
+        self.repair_cache_dir = os.path.abspath("cache/foldx_repair")
+        self.repair_cache_size = repair_cache_size
+        self.repair_cache_files = repair_cache_files
+        self._repair_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Keys RepairPDB failed on this session; not retried for every child
+        self._repair_failed = set()
+        self._bin_id = self._binary_identity()
     
-    def run_stability(self, pdb_content, log_callback=None):
-        job_id = f"foldx_{int(time.time()*1000)}"
+    def _binary_identity(self):
+        # Path, size and mtime: repairs from another FoldX build are not reused
+        try:
+            st = os.stat(self.bin_path)
+            return f"{self.bin_path}|{st.st_size}|{int(st.st_mtime)}"
+        except OSError:
+            return self.bin_path
+
+    def _repair_key(self, pdb_content):
+        return hashlib.sha256(f"{self._bin_id}\0{pdb_content}".encode()).hexdigest()
+
+    def _stage_rotabase(self, work_dir):
+        # Copy rotabase.txt
+        rotabase_source = os.path.join(os.path.dirname(self.bin_path), "rotabase.txt")
+        if not os.path.exists(rotabase_source):
+             # Try root
+             if os.path.exists("rotabase.txt"): rotabase_source = "rotabase.txt"
+        
+        if os.path.exists(rotabase_source):
+            shutil.copy(rotabase_source, os.path.join(work_dir, "rotabase.txt"))
+
+    def repair(self, pdb_content, log_callback=None, persist=False):
+        """
+        Runs FoldX RepairPDB, cached by input-structure hash. persist=True
+        (BuildModel parents) also keeps the result on disk, so a parent is
+        repaired once and reused by every child built on it, across runs.
+        Returns the input unchanged if RepairPDB fails; the failure is
+        remembered so the same structure is not retried this session.
+        """
+        key = self._repair_key(pdb_content)
+        repaired = self._cache_get(key)
+        if repaired is None:
+            if key in self._repair_failed:
+                return pdb_content
+            repaired = self._disk_get(key)
+            if repaired is None:
+                repaired = self._run_repair(pdb_content, key, log_callback)
+                if repaired is None:
+                    return pdb_content
+            # The repaired structure is also its own entry, so a repaired
+            # survivor is not repaired again when it becomes the next parent
+            self._cache_put(key, repaired)
+            self._cache_put(self._repair_key(repaired), repaired)
+        
+        if persist:
+            self._disk_put(key, repaired)
+        return repaired
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            repaired = self._repair_cache.get(key)
+            if repaired is not None:
+                self._repair_cache.move_to_end(key)
+            return repaired
+
+    def _cache_put(self, key, repaired):
+        with self._cache_lock:
+            self._repair_cache[key] = repaired
+            self._repair_cache.move_to_end(key)
+            while len(self._repair_cache) > self.repair_cache_size:
+                self._repair_cache.popitem(last=False)
+
+    def _disk_get(self, key):
+        cache_path = os.path.join(self.repair_cache_dir, f"{key}.pdb")
+        try:
+            with open(cache_path, "r") as f:
+                repaired = f.read()
+            os.utime(cache_path)  # recently used: evicted last
+            return repaired
+        except OSError:
+            return None
+
+    def _disk_put(self, key, repaired):
+        # Write-then-rename so concurrent readers never see a partial file
+        EngineUtils.ensure_dir(self.repair_cache_dir)
+        written = False
+        for k in (key, self._repair_key(repaired)):
+            path = os.path.join(self.repair_cache_dir, f"{k}.pdb")
+            if os.path.exists(path):
+                os.utime(path)
+                continue
+            tmp_path = f"{path}.{EngineUtils.new_job_id('tmp')}"
+            with open(tmp_path, "w") as f: f.write(repaired)
+            os.replace(tmp_path, path)
+            written = True
+        if written:
+            self._prune_disk_cache()
+
+    def _prune_disk_cache(self):
+        try:
+            entries = [os.path.join(self.repair_cache_dir, n) for n in os.listdir(self.repair_cache_dir) if n.endswith(".pdb")]
+            entries.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        for path in entries[:max(0, len(entries) - self.repair_cache_files)]:
+            try: os.remove(path)
+            except OSError: pass
+
+    def _run_repair(self, pdb_content, key, log_callback=None):
+        # Returns the repaired structure, or None (and memoises the failure)
+        job_id = EngineUtils.new_job_id("foldx_rp")
+        work_dir = os.path.abspath(f"temp/{job_id}")
+        EngineUtils.ensure_dir(work_dir)
+        
+        try:
+            with open(os.path.join(work_dir, "protein.pdb"), "w") as f: f.write(pdb_content)
+            self._stage_rotabase(work_dir)
+            
+            cmd = [
+                self.bin_path,
+                "--command=RepairPDB",
+                "--pdb=protein.pdb",
+                "--output-dir=."
+            ]
+            
+            if log_callback: log_callback("Running FoldX RepairPDB (cache miss)")
+            
+            start_time = time.time()
+            result = subprocess.run(cmd, capture_output=True, text=True, cwd=work_dir)
+            duration = time.time() - start_time
+            
+            outfile = os.path.join(work_dir, "protein_Repair.pdb")
+            if result.returncode != 0 or not os.path.exists(outfile):
+                if log_callback: log_callback(f"RepairPDB Failed (code {result.returncode}), using raw structure", 'warn')
+                self._repair_failed.add(key)
+                return None
+            
+            with open(outfile, "r") as f:
+                repaired = f.read()
+            
+            if log_callback: log_callback(f"RepairPDB Finished in {duration:.2f}s")
+            return repaired
+        
+        except Exception as e:
+            if log_callback: log_callback(f"RepairPDB Error: {e}, using raw structure", 'warn')
+            self._repair_failed.add(key)
+            return None
+            
+        finally:
+            EngineUtils.clean_dir(work_dir)
+
+    def run_stability(self, pdb_content, log_callback=None, repair=True):
+        if repair:
+            pdb_content = self.repair(pdb_content, log_callback)
+        
+        job_id = EngineUtils.new_job_id("foldx")
         work_dir = os.path.abspath(f"temp/{job_id}")
         EngineUtils.ensure_dir(work_dir)
         
@@ -202,14 +797,7 @@ class FoldXEngine:
             pdb_path = os.path.join(work_dir, "protein.pdb")
             with open(pdb_path, "w") as f: f.write(pdb_content)
             
-            # Copy rotabase.txt
-            rotabase_source = os.path.join(os.path.dirname(self.bin_path), "rotabase.txt")
-            if not os.path.exists(rotabase_source):
-                 # Try root
-                 if os.path.exists("rotabase.txt"): rotabase_source = "rotabase.txt"
-            
-            if os.path.exists(rotabase_source):
-                shutil.copy(rotabase_source, os.path.join(work_dir, "rotabase.txt"))
+            self._stage_rotabase(work_dir)
             
             cmd = [
                 self.bin_path,
@@ -242,6 +830,57 @@ class FoldXEngine:
         finally:
             EngineUtils.clean_dir(work_dir)
 
+    def build_model(self, parent_pdb, mutations, log_callback=None, repair=True):
+        """
+        Builds a point mutant of parent_pdb locally with FoldX BuildModel.
+        mutations: list of FoldX codes, e.g. ['KA12G', 'LA40V'].
+        Returns the mutant PDB content.
+        """
+        # Mutation codes name blank chains 'A' (see derive_mutations)
+        parent_pdb = EngineUtils.fill_blank_chain(parent_pdb)
+        if repair:
+            parent_pdb = self.repair(parent_pdb, log_callback, persist=True)
+        
+        job_id = EngineUtils.new_job_id("foldx_bm")
+        work_dir = os.path.abspath(f"temp/{job_id}")
+        EngineUtils.ensure_dir(work_dir)
+        
+        try:
+            with open(os.path.join(work_dir, "protein.pdb"), "w") as f: f.write(parent_pdb)
+            # One mutant per line, mutations comma separated, terminated by ';'
+            with open(os.path.join(work_dir, "individual_list.txt"), "w") as f:
+                f.write(",".join(mutations) + ";\n")
+            
+            self._stage_rotabase(work_dir)
+            
+            cmd = [
+                self.bin_path,
+                "--command=BuildModel",
+                "--pdb=protein.pdb",
+                "--mutant-file=individual_list.txt",
+                "--output-dir=."
+            ]
+            
+            if log_callback: log_callback(f"Running FoldX BuildModel ({len(mutations)} mutations)")
+            
+            start_time = time.time()
+            result = subprocess.run(cmd, capture_output=True, text=True, cwd=work_dir)
+            duration = time.time() - start_time
+            
+            # BuildModel writes the first (and only) mutant as protein_1.pdb
+            outfile = os.path.join(work_dir, "protein_1.pdb")
+            if result.returncode != 0 or not os.path.exists(outfile):
+                raise Exception(f"FoldX BuildModel failed (code {result.returncode}): {result.stdout[-200:]}")
+            
+            with open(outfile, "r") as f:
+                pdb_content = f.read()
+            
+            if log_callback: log_callback(f"BuildModel Finished in {duration:.2f}s")
+            return pdb_content
+            
+        finally:
+            EngineUtils.clean_dir(work_dir)
+
 
 # Real AI Clients
 
@@ -282,7 +921,7 @@ class ProteinMPNNClient:
             client = Client("simonduerr/ProteinMPNN")
             
             # Setup temp file
-            temp_pdb = os.path.abspath(f"temp_mpnn_{int(time.time())}.pdb")
+            temp_pdb = os.path.abspath(f"{EngineUtils.new_job_id('temp_mpnn')}.pdb")
             with open(temp_pdb, "w") as f: f.write(pdb_content)
             
             result = client.predict(
@@ -312,7 +951,7 @@ class ProteinMPNNClient:
                     try:
                         res_num = int(line[22:26])
                         res_name = line[17:20].strip()
-                        residues[res_num] = self._three_to_one(res_name)
+                        residues[res_num] = EngineUtils.three_to_one(res_name)
                     except: pass
             
             if not residues: return []
@@ -334,9 +973,6 @@ class ProteinMPNNClient:
             
             return variations
 
-    def _three_to_one(self, res):
-        return {'ALA':'A','CYS':'C','ASP':'D','GLU':'E','PHE':'F','GLY':'G','HIS':'H','ILE':'I','LYS':'K','LEU':'L','MET':'M','ASN':'N','PRO':'P','GLN':'Q','ARG':'R','SER':'S','THR':'T','VAL':'V','TRP':'W','TYR':'Y'}.get(res,'X')
-
 
 class ESMFoldClient:
     def fold(self, sequence, log_callback=None):
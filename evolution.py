@@ -1,12 +1,57 @@
 import time
-from engines import VinaEngine, FoldXEngine, ESMFoldClient, ProteinMPNNClient, PDBQTConverter
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from engines import VinaEngine, FoldXEngine, ESMFoldClient, ProteinMPNNClient, PDBQTConverter, EngineUtils, ContactScoringEngine
+from surrogate import SurrogateModel
+from vault import DesignVault
+
+
+class _Cancelled(Exception):
+    """Raised inside speculative work once its parent has been ruled out."""
+
 
 class EvolutionEngine:
-    def __init__(self, initial_pdb, ligand_pdbqt, variants=5, generations=5):
+    def __init__(self, initial_pdb, ligand_pdbqt, variants=5, generations=5, mutation_threshold=5,
+                 oversample=1, explore_fraction=0.2, prefilter_keep=None,
+                 vault=None, run_id=None, dedupe_similarity=0.97,
+                 workers=1, pipeline=False, speculate_after=0.5):
         self.initial_pdb = initial_pdb
         self.ligand_pdbqt = ligand_pdbqt
         self.variants_per_gen = variants
         self.generations = generations
+        # Variants with at most this many point mutations vs. the parent are
+        # built locally with FoldX BuildModel instead of refolded by ESMFold.
+        # 0 disables the fast path.
+        self.mutation_threshold = mutation_threshold
+        # Design oversample x variants candidates per generation and let the
+        # surrogate choose which ones are folded/docked. 1 disables pre-ranking.
+        self.oversample = max(1, int(oversample))
+        self.explore_fraction = explore_fraction
+        # Upper bound on extra redesign calls when MPNN keeps returning repeats
+        self.max_redesigns = 20
+        # Fraction of modelled variants (ranked by contact score) that go on
+        # to Vina/FoldX. None disables the contact pre-filter.
+        self.prefilter_keep = prefilter_keep
+        # Optional DesignVault: every evaluated variant is recorded, and
+        # designs at least dedupe_similarity (k-mer Jaccard) to a prior one
+        # for the same ligand are skipped.
+        self.vault = vault
+        self.run_id = run_id
+        self.dedupe_similarity = dedupe_similarity
+        self.ligand_key = DesignVault.ligand_key(ligand_pdbqt)
+        # Variants are docked/scored on `workers` threads. With pipeline on,
+        # once speculate_after of a generation's results are in, the next
+        # generation is designed and folded from the provisional best on a
+        # thread of its own; that work is kept if the final survivor
+        # matches, cancelled otherwise.
+        self.workers = max(1, int(workers))
+        self.pipeline = pipeline
+        self.speculate_after = speculate_after
+        self.executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self.spec_executor = ThreadPoolExecutor(max_workers=1) if pipeline else None
+        self._speculation = None
+        self.speculation_stats = {'hits': 0, 'misses': 0}
         
         # Engines
         self.vina = VinaEngine()
@@ -14,11 +59,28 @@ class EvolutionEngine:
         self.esmfold = ESMFoldClient()
         self.mpnn = ProteinMPNNClient()
         self.converter = PDBQTConverter()
+        self.surrogate = SurrogateModel()
+        self.contact = ContactScoringEngine()
         
         # State
         self.current_best_pdb = initial_pdb
         self.current_best_affinity = 0.0 # High (bad) start
+        self.current_best_id = None
+        self.current_best_method = None
+        self.has_best = False
+        # Docked pose of the best design so far and the pocket it was docked
+        # into; contact scoring places it into each new variant's pocket.
+        self.reference_pose = ligand_pdbqt
+        self.reference_center = None
         
+    @property
+    def affinity_method(self):
+        """
+        The scoring method this campaign ranks by: 'vina' when docking can
+        run, else 'contact'. Scores from the two are never compared.
+        """
+        return 'vina' if self.vina.available or not self.contact.available else 'contact'
+
     def run_wrapper(self, log_callback):
         """
         Generator that yields results per generation.
@@ -33,66 +95,409 @@ class EvolutionEngine:
         if log_callback: 
             log_callback(f"--- Starting Generation {gen_idx + 1} ---")
             
+        # 1-3. Design, model and pre-filter from the current best structure,
+        # unless a speculative run from the same parent already did it
+        modelled = self._take_speculation(gen_idx, log_callback)
+        if modelled is None:
+            modelled = self._design_and_model(gen_idx, self.current_best_pdb, log_callback)
+        
+        # 4-5. Dock and score (may start speculating on the next generation)
+        results = self._evaluate_all(gen_idx, modelled, log_callback)
+            
+        # 6. Select Survivor (Greedy), comparing like-for-like scores only
+        best_of_gen = self.best_of(results)
+        self._record(results, best_of_gen)
+        
+        if self._improves(best_of_gen):
+            self.has_best = True
+            self.current_best_affinity = best_of_gen['affinity']
+            self.current_best_method = best_of_gen['affinity_method']
+            self.current_best_pdb = best_of_gen['pdb_data']
+            self.current_best_id = best_of_gen['vault_id']
+            if best_of_gen['pose']:
+                self.reference_pose = best_of_gen['pose']
+                self.reference_center = best_of_gen['center']
+            if log_callback: log_callback(f"  ★ New Best Design: {best_of_gen['id']} (Aff: {self.current_best_affinity})", 'success')
+        
+        self._resolve_speculation(log_callback)
+        
+        # 7. Train Surrogate on what was actually evaluated (one scoring
+        # method only, so fallback scores do not skew its scale)
+        primary = [r for r in results if r['affinity_method'] == self.affinity_method]
+        mae = self.surrogate.update([r['sequence'] for r in primary], [r['affinity'] for r in primary])
+        if mae is not None and log_callback:
+            log_callback(f"  Surrogate error (MAE): {mae:.2f} kcal/mol over {len(primary)} variants")
+            
+        return results
+
+    def best_of(self, results):
+        """
+        The generation's survivor: lowest affinity among results scored by
+        the campaign's method, or among all of them if every variant fell
+        back. Affinities from different methods are not comparable.
+        """
+        primary = [r for r in results if r['affinity_method'] == self.affinity_method]
+        return min(primary or results, key=lambda x: x['affinity'])
+
+    def _improves(self, result):
+        """
+        Whether result should replace the current best. A score from the
+        campaign's method always replaces one from the fallback method.
+        """
+        if not self.has_best:
+            return True
+        if result['affinity_method'] != self.current_best_method:
+            return result['affinity_method'] == self.affinity_method
+        return result['affinity'] < self.current_best_affinity
+
+    @staticmethod
+    def _check(cancel):
+        if cancel is not None and cancel.is_set():
+            raise _Cancelled()
+
+    def _design_and_model(self, gen_idx, parent_pdb, log_callback=None, cancel=None, prefilter=True):
+        """
+        Designs variants of parent_pdb, models their structures and applies
+        the contact pre-filter. Returns [(var_id, seq, mutations, pdb, method)].
+        Raises _Cancelled between steps once `cancel` (an Event) is set.
+        """
         # 1. Generate Variations (Mutations)
-        # We start from the current best structure
-        variations = self.mpnn.redesign(self.current_best_pdb, log_callback)
+        variations = []
+        seen = set()
+        self._add_unique(variations, seen, self.mpnn.redesign(parent_pdb, log_callback))
         
-        # Ensure we have enough variations
-        while len(variations) < self.variants_per_gen:
+        # Ensure we have enough unique variations (oversampled pool for the
+        # surrogate); give up after a bounded number of redesigns
+        pool_size = self.variants_per_gen * self.oversample
+        attempts = 0
+        while len(variations) < pool_size and attempts < self.max_redesigns:
+             self._check(cancel)
              # Add more (dummy extension of logic)
-             extra = self.mpnn.redesign(self.current_best_pdb)
-             variations.extend(extra)
+             extra = self.mpnn.redesign(parent_pdb)
+             self._add_unique(variations, seen, extra)
+             attempts += 1
+        if len(variations) < self.variants_per_gen and log_callback:
+            log_callback(f"Only {len(variations)} unique designs after {attempts + 1} redesign calls", 'warn')
              
-        variations = variations[:self.variants_per_gen]
-        
-        results = []
+        self._check(cancel)
+        variations = self._select_variations(variations, log_callback)
         
+        # 2. Fold Sequences (or model point mutants on the parent)
+        modelled = []
         for i, (seq, mutations) in enumerate(variations):
+            self._check(cancel)
             var_id = f"G{gen_idx+1}_V{i+1}"
             if log_callback: log_callback(f"Processing Variant {var_id}: {mutations}")
-            
-            # 2. Fold Sequence
-            pdb_content = self.esmfold.fold(seq, log_callback)
-            
-            # 3. Docking (Vina)
-            # Convert to PDBQT
-            rec_pdbqt = self.converter.convert(pdb_content)
-            
-            # Run Vina
-            # We need center/size. For now we use default (0,0,0) (20,20,20).
-            # Ideally we should calculate center of mass of the PDB.
-            # But calculating center of mass in Python is easy.
-            center = self._calculate_center(pdb_content)
-            
-            affinity, _ = self.vina.run(rec_pdbqt, self.ligand_pdbqt, center=center, log_callback=log_callback)
-            
-            # 4. Stability (FoldX)
-            stability = self.foldx.run_stability(pdb_content, log_callback)
-            
-            # Record Result
-            res = {
-                'id': var_id,
-                'generation': gen_idx + 1,
-                'sequence': seq,
-                'mutations': mutations,
-                'affinity': affinity,
-                'stability': stability,
-                'pdb_data': pdb_content
-            }
-            results.append(res)
-            
-            if log_callback: log_callback(f"  > Score: Affinity {affinity}, Stability {stability}")
-            
-        # 5. Select Survivor (Greedy)
-        best_of_gen = min(results, key=lambda x: x['affinity'])
+            pdb_content, model_method = self._model_variant(seq, parent_pdb, log_callback)
+            modelled.append((var_id, seq, mutations, pdb_content, model_method))
         
-        if gen_idx == 0 or best_of_gen['affinity'] < self.current_best_affinity:
-            self.current_best_affinity = best_of_gen['affinity']
-            self.current_best_pdb = best_of_gen['pdb_data']
-            if log_callback: log_callback(f"  ★ New Best Design: {best_of_gen['id']} (Aff: {self.current_best_affinity})", 'success')
-            
+        # 3. Contact Pre-filter (milliseconds per variant)
+        self._check(cancel)
+        return self._prefilter(modelled, log_callback) if prefilter else modelled
+
+    def _evaluate_all(self, gen_idx, modelled, log_callback=None):
+        """
+        Docks and scores modelled variants, in parallel when workers > 1.
+        Results come back in variant order.
+        """
+        threshold = math.ceil(self.speculate_after * len(modelled))
+        if self.executor is None:
+            results = []
+            for item in modelled:
+                results.append(self._evaluate_variant(gen_idx, *item, log_callback))
+                if len(results) >= threshold:
+                    self._maybe_speculate(gen_idx, results, log_callback)
+            return results
+        
+        futures = {self.executor.submit(self._evaluate_variant, gen_idx, *item, log_callback): i for i, item in enumerate(modelled)}
+        results = [None] * len(modelled)
+        done = []
+        for future in as_completed(futures):
+            res = future.result()
+            results[futures[future]] = res
+            done.append(res)
+            if len(done) >= threshold:
+                self._maybe_speculate(gen_idx, done, log_callback)
         return results
 
+    def _maybe_speculate(self, gen_idx, done, log_callback=None):
+        """
+        Starts designing/folding generation gen_idx + 1 from the parent the
+        partial results point to, on the speculation thread.
+
+        Speculative designs are ranked by the surrogate as trained up to the
+        previous generation; the vault dedupe and the contact pre-filter are
+        redone when the work is taken (see _take_speculation).
+        """
+        if not self.pipeline or self._speculation is not None or gen_idx + 1 >= self.generations:
+            return
+        
+        provisional = self.best_of(done)
+        if self._improves(provisional):
+            parent_pdb, parent_id = provisional['pdb_data'], self._vault_id(provisional)
+        else:
+            parent_pdb, parent_id = self.current_best_pdb, self.current_best_id
+        
+        if log_callback: log_callback(f"Speculating on Generation {gen_idx + 2} from provisional best {provisional['id']} ({len(done)} results in)")
+        cancel = threading.Event()
+        self._speculation = {
+            'gen_idx': gen_idx + 1,
+            'parent_pdb': parent_pdb,
+            'parent_id': parent_id,
+            'cancel': cancel,
+            'future': self.spec_executor.submit(self._design_and_model, gen_idx + 1, parent_pdb, log_callback, cancel, False)
+        }
+
+    def _speculation_matches(self, spec, gen_idx):
+        return (spec['gen_idx'] == gen_idx
+                and spec['parent_id'] == self.current_best_id
+                and spec['parent_pdb'] == self.current_best_pdb)
+
+    @staticmethod
+    def _discard(spec):
+        # Running work stops at its next checkpoint; queued work never starts
+        spec['cancel'].set()
+        spec['future'].cancel()
+
+    def _resolve_speculation(self, log_callback=None):
+        """
+        Called once the survivor is known: keeps speculative work whose parent
+        matches it, discards the rest, and updates the hit rate.
+        """
+        spec = self._speculation
+        if spec is None or spec.get('resolved'): return
+        
+        if self._speculation_matches(spec, spec['gen_idx']):
+            spec['resolved'] = True
+            self.speculation_stats['hits'] += 1
+            outcome = "kept"
+        else:
+            self._discard(spec)
+            self._speculation = None
+            self.speculation_stats['misses'] += 1
+            outcome = "discarded"
+        
+        if log_callback: log_callback(f"  Speculation {outcome} (hit rate {self.speculation_hit_rate:.0%} over {sum(self.speculation_stats.values())})")
+
+    def _take_speculation(self, gen_idx, log_callback=None):
+        """
+        Returns the speculatively modelled variants for gen_idx, or None.
+        Designs the vault learned about since speculation started are
+        dropped, and the contact pre-filter runs against the current
+        reference pose, as they would on the sequential path.
+        """
+        spec, self._speculation = self._speculation, None
+        if spec is None or not self._speculation_matches(spec, gen_idx):
+            if spec is not None: self._discard(spec)
+            return None
+        
+        try:
+            modelled = spec['future'].result()
+        except Exception as e:
+            if log_callback: log_callback(f"Speculative design failed ({e}), redesigning", 'warn')
+            return None
+        
+        if self.vault is not None:
+            fresh = [item for item in modelled if not self.vault.nearest(
+                item[1], limit=1, min_similarity=self.dedupe_similarity,
+                ligand_key=self.ligand_key, affinity_method=self.affinity_method)]
+            if len(fresh) < len(modelled) and log_callback:
+                log_callback(f"Vault: dropping {len(modelled) - len(fresh)} speculative designs seen since")
+            modelled = fresh
+        if not modelled:
+            return None
+        
+        if log_callback: log_callback(f"Using speculative designs for Generation {gen_idx + 1}")
+        return self._prefilter(modelled, log_callback)
+
+    @property
+    def speculation_hit_rate(self):
+        total = self.speculation_stats['hits'] + self.speculation_stats['misses']
+        return self.speculation_stats['hits'] / total if total else 0.0
+
+    def close(self):
+        """
+        Cancels speculative work and waits for worker threads to finish,
+        so the vault can be closed safely afterwards.
+        """
+        spec, self._speculation = self._speculation, None
+        if spec is not None:
+            self._discard(spec)
+        if self.spec_executor is not None:
+            self.spec_executor.shutdown(wait=True, cancel_futures=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _add_unique(variations, seen, extra):
+        for seq, mutations in extra:
+            if seq in seen: continue
+            seen.add(seq)
+            variations.append((seq, mutations))
+
+    def _select_variations(self, pool, log_callback=None):
+        """
+        Keeps variants_per_gen of the (already unique) designed pool, ranked
+        by the surrogate once it has enough training data.
+        """
+        # Skip designs the vault already holds (or near-duplicates of them),
+        # topping up from them only if too few novel ones remain
+        if self.vault is not None:
+            novel, known = [], []
+            for item in pool:
+                hits = self.vault.nearest(item[0], limit=1, min_similarity=self.dedupe_similarity,
+                                          ligand_key=self.ligand_key, affinity_method=self.affinity_method)
+                (known if hits else novel).append(item)
+            if known and log_callback:
+                log_callback(f"Vault: skipping {len(known)} near-duplicate designs")
+            pool = novel + known[:max(0, self.variants_per_gen - len(novel))]
+        
+        selected = self.surrogate.select(pool, self.variants_per_gen, self.explore_fraction)
+        if self.surrogate.is_ready and len(pool) > len(selected) and log_callback:
+            log_callback(f"Surrogate pre-ranked {len(pool)} designs, evaluating {len(selected)}")
+        return selected
+
+    def _record(self, results, best_of_gen):
+        """
+        Tags results with vault ids and lineage, and stores them in the vault.
+        Only the generation's best keeps its structure to bound vault size.
+        """
+        for r in results:
+            r['parent_id'] = self.current_best_id
+            r['vault_id'] = self._vault_id(r)
+            if self.vault is not None:
+                stored = r if r is best_of_gen else dict(r, pdb_data=None)
+                self.vault.add(stored, run_id=self.run_id, ligand_key=self.ligand_key, parent_id=self.current_best_id)
+
+    def _vault_id(self, result):
+        return f"{self.run_id}:{result['id']}" if self.run_id else result['id']
+
+    def seed_from_vault(self, log_callback=None, min_similarity=0.5):
+        """
+        Starts the campaign from the best-scoring prior design near the input
+        protein (same ligand, same scoring method) instead of from the raw
+        input structure, including its docked pose. Returns the seed design,
+        or None.
+        """
+        if self.vault is None: return None
+        
+        seq = ''.join(r[2] for r in EngineUtils.extract_residues(self.initial_pdb))
+        seeds = self.vault.seeds(seq, limit=1, min_similarity=min_similarity,
+                                 ligand_key=self.ligand_key, affinity_method=self.affinity_method)
+        if not seeds: return None
+        
+        seed = seeds[0]
+        self.has_best = True
+        self.current_best_pdb = seed['pdb_data']
+        self.current_best_affinity = seed['affinity']
+        self.current_best_method = seed['affinity_method']
+        self.current_best_id = seed['id']
+        if seed['pose']:
+            self.reference_pose = seed['pose']
+            self.reference_center = seed['center']
+        if log_callback: log_callback(f"Seeded from vault design {seed['id']} (Aff: {seed['affinity']}, similarity {seed['similarity']:.2f})", 'success')
+        return seed
+
+    def _evaluate_variant(self, gen_idx, var_id, seq, mutations, pdb_content, model_method, log_callback=None):
+        """
+        Docks and scores one modelled variant. Returns its result dict.
+        """
+        # We need center/size. For now we use default size (20,20,20)
+        # centred on the CA centre of mass.
+        center = self._calculate_center(pdb_content)
+        
+        # 4. Docking (Vina), or the contact proxy if Vina is not installed
+        # or cannot dock this receptor
+        pose = None
+        affinity = None
+        if self.vina.available or not self.contact.available:
+            try:
+                rec_pdbqt = self.converter.convert(pdb_content)
+                affinity, pose = self.vina.run(rec_pdbqt, self.ligand_pdbqt, center=center, log_callback=log_callback)
+                affinity_method = 'vina'
+            except Exception as e:
+                if not self.contact.available: raise
+                if log_callback: log_callback(f"Docking failed for {var_id}: {e}. Falling back to contact score.", 'warn')
+        if affinity is None:
+            affinity, _ = self.contact.score(pdb_content, self.reference_pose, self._contact_center(pdb_content), self.reference_center, log_callback)
+            affinity_method = 'contact'
+        
+        # 5. Stability (FoldX)
+        # BuildModel children are already built on the repaired parent
+        stability = self.foldx.run_stability(pdb_content, log_callback, repair=(model_method != 'buildmodel'))
+        
+        if log_callback: log_callback(f"  > Score: Affinity {affinity}, Stability {stability}")
+        
+        return {
+            'id': var_id,
+            'generation': gen_idx + 1,
+            'sequence': seq,
+            'mutations': mutations,
+            'affinity': affinity,
+            'affinity_method': affinity_method,
+            'stability': stability,
+            'model_method': model_method,
+            'center': center,
+            'pose': pose,
+            'pdb_data': pdb_content
+        }
+
+    def _prefilter(self, modelled, log_callback=None):
+        """
+        Keeps the best prefilter_keep fraction of modelled variants by contact
+        score against the reference pose. No-op when disabled, when the
+        contact engine is unavailable, or when Vina is missing (the contact
+        score is then the affinity itself).
+        """
+        if not self.prefilter_keep or not self.contact.available or not self.vina.available:
+            return modelled
+        
+        keep = max(1, math.ceil(len(modelled) * self.prefilter_keep))
+        if keep >= len(modelled):
+            return modelled
+        
+        scored = []
+        for item in modelled:
+            var_id, _, _, pdb_content, _ = item
+            try:
+                score, _ = self.contact.score(pdb_content, self.reference_pose, self._contact_center(pdb_content), self.reference_center)
+            except Exception as e:
+                if log_callback: log_callback(f"Contact scoring failed for {var_id}: {e}", 'warn')
+                score = float('inf')
+            scored.append((score, item))
+        
+        scored.sort(key=lambda x: x[0])
+        dropped = [item[0] for _, item in scored[keep:]]
+        if log_callback: log_callback(f"Contact pre-filter kept {keep}/{len(modelled)} (dropped {', '.join(dropped)})")
+        return [item for _, item in scored[:keep]]
+
+    def _model_variant(self, seq, parent_pdb, log_callback=None):
+        """
+        Returns (pdb_content, method) for a designed sequence.
+        Low-mutation children are built from parent_pdb with FoldX
+        BuildModel; everything else goes to ESMFold.
+        """
+        mutations = EngineUtils.derive_mutations(parent_pdb, seq)
+        
+        if mutations is not None and len(mutations) == 0:
+            return parent_pdb, 'parent'
+        
+        if mutations is not None and len(mutations) <= self.mutation_threshold:
+            try:
+                if log_callback: log_callback(f"  Modelling {','.join(mutations)} on parent (BuildModel)")
+                return self.foldx.build_model(parent_pdb, mutations, log_callback), 'buildmodel'
+            except Exception as e:
+                if log_callback: log_callback(f"BuildModel Failed: {e}. Falling back to ESMFold.", 'warn')
+        
+        return self.esmfold.fold(seq, log_callback), 'esmfold'
+
+    def _contact_center(self, pdb_content):
+        # Until a docked pose fixes the pocket, place the ligand at the
+        # estimated cavity rather than the CA centroid (the protein core)
+        if self.reference_center is None:
+            return self.contact.estimate_pocket(pdb_content)
+        return self._calculate_center(pdb_content)
+
     def _calculate_center(self, pdb_content):
         # Extract CA atoms and average
         coords = []
@@ -12,6 +12,7 @@ from datetime import datetime
 from engines import VinaEngine, FoldXEngine, ProteinMPNNClient, ESMFoldClient
 from evolution import EvolutionEngine
 from vis_connector import ChimeraXConnector
+from vault import DesignVault
 
 # App Config
 ctk.set_appearance_mode("Dark")
@@ -86,6 +87,10 @@ class ProteinRefineryApp(ctk.CTk):
         self.slider_gen.set(5)
         self.slider_gen.grid(row=9, column=0, padx=20, pady=5)
 
+        # Off by default: each run starts from the loaded structure
+        self.toggle_seed = ctk.CTkSwitch(self.sidebar, text="Seed from Vault")
+        self.toggle_seed.grid(row=10, column=0, padx=20, pady=5)
+
         # Actions
         self.btn_start = ctk.CTkButton(self.sidebar, text="🚀 START EVOLUTION", fg_color="green", hover_color="darkgreen", command=self._start_evolution)
         self.btn_start.grid(row=11, column=0, padx=20, pady=20)
@@ -143,7 +148,7 @@ class ProteinRefineryApp(ctk.CTk):
                         self.chimera.open_structure(res['pdb_path'])
                         
                 elif res['type'] == 'new_best':
-                    self.lbl_best.configure(text=f"Best Affinity: {res['affinity']:.2f}")
+                    self.lbl_best.configure(text=f"Best Affinity: {res['affinity']:.2f} ({res['affinity_method']})")
                     
                 elif res['type'] == 'finish':
                     self.evolution_active = False
@@ -211,26 +216,33 @@ class ProteinRefineryApp(ctk.CTk):
         self._log("Starting Evolution (Threaded)...")
         
         gens = int(self.slider_gen.get())
+        seed = bool(self.toggle_seed.get())
         
         # Create Thread
-        t = threading.Thread(target=self._evolution_job, args=(gens,))
+        t = threading.Thread(target=self._evolution_job, args=(gens, seed))
         t.start()
 
-    def _evolution_job(self, generations):
+    def _evolution_job(self, generations, seed_from_vault=False):
+        # Create temp dir for outputs
+        session_id = f"run_{int(time.time())}"
+        out_dir = os.path.abspath(f"outputs/{session_id}")
+        if not os.path.exists(out_dir): os.makedirs(out_dir)
+
+        # Vault of every design evaluated across runs
+        vault = DesignVault(os.path.abspath("vault/designs.db"))
+
         evo = EvolutionEngine(
             initial_pdb=self.pdb_content,
             ligand_pdbqt=self.ligand_pdbqt,
             variants=3, # Hardcoded small batch for speed/demo
-            generations=generations
+            oversample=3, # Surrogate pre-ranks 9 designs down to 3
+            generations=generations,
+            vault=vault,
+            run_id=session_id
         )
-        
-        # Create temp dir for outputs
-        session_id = f"run_{int(time.time())}"
-        out_dir = os.path.abspath(f"outputs/{session_id}")
-        if not os.path.exists(out_dir): os.makedirs(out_dir)
+        if seed_from_vault:
+            evo.seed_from_vault(lambda m, t='info': self._log(m))
 
-        best_score = 0.0
-        
         try:
              for gen in range(generations):
                  self._log(f"--- Generation {gen+1} Started ---")
@@ -243,11 +255,12 @@ class ProteinRefineryApp(ctk.CTk):
                      self._log("Warning: No results in this generation.")
                      continue
 
-                 # Analyze best
-                 best = min(results, key=lambda x: x['affinity'])
-                 if str(best['affinity']) < str(best_score) or gen == 0:
-                     best_score = best['affinity']
-                     self.result_queue.put({'type': 'new_best', 'affinity': best_score})
+                 # Analyze best (the engine's survivor: Vina and contact
+                 # fallback scores in one generation are not comparable)
+                 best = evo.best_of(results)
+                 self._log(f"Generation {gen+1} best: {best['id']} ({best['affinity']:.2f}, {best['affinity_method']})")
+                 if evo.current_best_id == best['vault_id']:
+                     self.result_queue.put({'type': 'new_best', 'affinity': best['affinity'], 'affinity_method': best['affinity_method']})
                  
                  # Save Best PDB to disk
                  best_pdb_path = os.path.join(out_dir, f"{best['id']}.pdb")
@@ -264,6 +277,8 @@ class ProteinRefineryApp(ctk.CTk):
             import traceback
             self._log(traceback.format_exc())
             
+        evo.close()
+        vault.close()
         self.result_queue.put({'type': 'finish'})
 
 if __name__ == "__main__":
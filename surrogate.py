@@ -0,0 +1,108 @@
+import random
+import threading
+from collections import deque
+
+
+class SurrogateModel:
+    """
+    Online ridge regressor over sparse sequence features (position one-hot
+    plus k-mer composition). Each update takes a few SGD passes over the new
+    batch plus a bounded sample of earlier variants (replay buffer), so the
+    cost per generation does not grow with the campaign. Used to pre-rank
+    designed sequences so only the most promising ones are folded and docked.
+    Lower predictions are better (same convention as Vina affinity).
+    """
+
+    def __init__(self, k=3, l2=1e-3, lr=0.5, epochs=5, min_train=6, replay_size=256, replay_sample=64, seed=None):
+        self.k = k
+        self.l2 = l2
+        self.lr = lr
+        self.epochs = epochs
+        self.min_train = min_train
+        self.replay_sample = replay_sample
+        self.rng = random.Random(seed)
+        # Speculative design may rank candidates while a generation trains
+        self._lock = threading.RLock()
+
+        self.weights = {}
+        self.bias = 0.0
+        self.replay = deque(maxlen=replay_size)  # recent (features, score)
+        self.n_seen = 0
+        # One entry per update: prediction error on the new batch, measured
+        # before the model was trained on it.
+        self.error_history = []
+
+    @property
+    def is_ready(self):
+        return self.n_seen >= self.min_train
+
+    def featurize(self, sequence):
+        feats = {}
+        for i, aa in enumerate(sequence):
+            feats[f"p{i}:{aa}"] = 1.0
+        for size in range(1, self.k + 1):
+            for i in range(len(sequence) - size + 1):
+                key = f"k:{sequence[i:i+size]}"
+                feats[key] = feats.get(key, 0.0) + 1.0
+        return feats
+
+    def _predict_features(self, feats):
+        return self.bias + sum(self.weights.get(f, 0.0) * v for f, v in feats.items())
+
+    def predict(self, sequence):
+        with self._lock:
+            return self._predict_features(self.featurize(sequence))
+
+    def update(self, sequences, scores):
+        """
+        Trains on newly evaluated variants. Returns the mean absolute error
+        of the pre-update predictions on this batch (None while untrained).
+        """
+        batch = [(self.featurize(s), float(y)) for s, y in zip(sequences, scores) if y is not None]
+        if not batch: return None
+
+        with self._lock:
+            mae = None
+            if self.is_ready:
+                mae = sum(abs(self._predict_features(f) - y) for f, y in batch) / len(batch)
+                self.error_history.append({'n_train': self.n_seen, 'n': len(batch), 'mae': mae})
+
+            if self.n_seen == 0:
+                # Start the intercept at the first batch mean; from then on it
+                # is learned jointly with the weights
+                self.bias = sum(y for _, y in batch) / len(batch)
+            self._fit(batch)
+            self.replay.extend(batch)
+            self.n_seen += len(batch)
+        return mae
+
+    def _fit(self, batch):
+        replay = self.rng.sample(list(self.replay), min(self.replay_sample, len(self.replay)))
+        samples = batch + replay
+        for epoch in range(self.epochs):
+            self.rng.shuffle(samples)
+            lr = self.lr / (1 + epoch)
+            for feats, y in samples:
+                # Normalised step so long sequences (many features) stay stable
+                norm = 1.0 + sum(v * v for v in feats.values())
+                err = (self._predict_features(feats) - y) / norm
+                self.bias -= lr * err
+                for f, v in feats.items():
+                    w = self.weights.get(f, 0.0)
+                    self.weights[f] = w - lr * (err * v + self.l2 * w)
+
+    def select(self, candidates, n, explore_fraction=0.2, key=lambda c: c[0]):
+        """
+        Picks n candidates: the top-ranked by prediction, plus a random
+        exploration share from the remainder. key extracts the sequence.
+        Returns candidates unchanged (truncated) while the model is untrained.
+        """
+        if not self.is_ready or len(candidates) <= n:
+            return list(candidates[:n])
+
+        with self._lock:
+            ranked = sorted(candidates, key=lambda c: self.predict(key(c)))
+            n_explore = min(int(round(n * explore_fraction)), n - 1)
+            chosen = ranked[:n - n_explore]
+            chosen += self.rng.sample(ranked[n - n_explore:], n_explore)
+        return chosen
@@ -0,0 +1,88 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from engines import ContactScoringEngine
+
+
+def atom(n, name, el, x, y, z, record="ATOM  ", res="ALA"):
+    return f"{record}{n:>5}  {name:<3} {res} A{n:>4}    {x:>8.3f}{y:>8.3f}{z:>8.3f}  1.00  0.00          {el:>2}"
+
+
+def shell_receptor(radius=7.0, n=300):
+    # Carbon atoms on a sphere: an empty, fully buried cavity at the origin
+    lines = []
+    golden = math.pi * (3 - math.sqrt(5))
+    for i in range(n):
+        y = 1 - 2 * (i + 0.5) / n
+        r = math.sqrt(1 - y * y)
+        x, z = r * math.cos(golden * i), r * math.sin(golden * i)
+        lines.append(atom(i + 1, "C", "C", radius * x, radius * y, radius * z))
+    return "\n".join(lines)
+
+
+LIGAND = "\n".join([
+    atom(1, "C", "C", 0.0, 0.0, 0.0, record="HETATM", res="LIG"),
+    atom(2, "C", "C", 1.5, 0.0, 0.0, record="HETATM", res="LIG"),
+    atom(3, "O", "O", 2.2, 1.1, 0.0, record="HETATM", res="LIG"),
+])
+
+
+def test_pocket_estimate_finds_the_cavity():
+    engine = ContactScoringEngine()
+    centre = engine.estimate_pocket(shell_receptor())
+    assert np.linalg.norm(centre) < 1.5
+
+
+def test_ligand_in_pocket_beats_ligand_in_wall():
+    engine = ContactScoringEngine(translation_radius=0)
+    receptor = shell_receptor()
+    in_pocket, terms = engine.score(receptor, LIGAND, center=(0, 0, 0))
+    in_wall, wall_terms = engine.score(receptor, LIGAND, center=(7, 0, 0))
+    assert in_pocket < 0
+    assert in_pocket < in_wall
+    assert terms["clashes"] == 0
+    assert wall_terms["clashes"] > 0
+    assert wall_terms["repulsion"] > terms["repulsion"]
+
+
+def test_translation_search_escapes_a_clash():
+    receptor = shell_receptor()
+    fixed, _ = ContactScoringEngine(translation_radius=0).score(receptor, LIGAND, center=(5.5, 0, 0))
+    searched, terms = ContactScoringEngine().score(receptor, LIGAND, center=(5.5, 0, 0))
+    assert searched < fixed
+    # The best pose moved back towards the cavity
+    assert terms["translation"][0] < 0
+
+
+def test_terms_are_reported_for_best_pose():
+    engine = ContactScoringEngine()
+    score, terms = engine.score(shell_receptor(), LIGAND, center=(0, 0, 0))
+    for key in ("gauss1", "gauss2", "repulsion", "hydrophobic", "hbond", "contacts", "clashes", "orientation", "translation"):
+        assert key in terms
+    assert 0 <= terms["orientation"] < engine.n_orientations
+    assert score < 0
+
+
+def test_pocket_estimate_is_cached_per_structure():
+    engine = ContactScoringEngine()
+    calls = []
+    estimate = engine._estimate_pocket
+    engine._estimate_pocket = lambda *args: calls.append(args) or estimate(*args)
+    receptor = shell_receptor()
+    first = engine.estimate_pocket(receptor)
+    assert engine.estimate_pocket(receptor) == first
+    engine.estimate_pocket(shell_receptor(radius=8.0))
+    assert len(calls) == 2
+
+
+def test_only_the_best_rotations_are_translated():
+    engine = ContactScoringEngine(refine_top=2)
+    poses = []
+    score_poses = engine._score_poses
+    engine._score_poses = lambda p, atoms: poses.append(len(p)) or score_poses(p, atoms)
+    engine.score(shell_receptor(), LIGAND, center=(5.5, 0, 0))
+    assert poses == [engine.n_orientations, 2 * (len(engine._translations) - 1)]
@@ -0,0 +1,93 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip("requests")
+
+from engines import DockingBackend, SubprocessVinaBackend, VinaEngine
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="executable bits and .exe handling differ on Windows")
+
+
+def make_binary(path, executable=True):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("#!/bin/sh\n")
+    if executable:
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+def path_vina(tmp_path, monkeypatch):
+    vina = make_binary(tmp_path / "path" / "vina")
+    monkeypatch.setenv("PATH", str(tmp_path / "path"))
+    monkeypatch.chdir(tmp_path)
+    return vina
+
+
+@posix_only
+def test_configured_binary_wins_over_path(tmp_path, path_vina):
+    mine = make_binary(tmp_path / "mine" / "vina")
+    backend = SubprocessVinaBackend(mine)
+    assert backend.bin_path == mine
+    assert backend.is_available()
+
+
+@posix_only
+def test_path_vina_replaces_a_binary_that_cannot_run(tmp_path, path_vina):
+    exe = make_binary(tmp_path / "bin" / "vina.exe")
+    assert SubprocessVinaBackend(exe).bin_path == path_vina
+
+    not_executable = make_binary(tmp_path / "mine" / "vina", executable=False)
+    assert SubprocessVinaBackend(not_executable).bin_path == path_vina
+
+
+@posix_only
+def test_nothing_runnable_is_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+    monkeypatch.chdir(tmp_path)
+    exe = make_binary(tmp_path / "bin" / "vina.exe")
+    backend = SubprocessVinaBackend(exe)
+    assert backend.bin_path == exe
+    assert not backend.is_available()
+
+
+class StubBackend(DockingBackend):
+    def __init__(self, name, result=None, error=None, available=True):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.available = available
+        self.calls = 0
+
+    def is_available(self):
+        return self.available
+
+    def dock(self, receptor_pdbqt, ligand_pdbqt, center=(0, 0, 0), size=(20, 20, 20), log_callback=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_docking_backend_is_abstract():
+    with pytest.raises(TypeError):
+        DockingBackend()
+
+
+def test_in_process_failure_retries_with_subprocess():
+    engine = VinaEngine(backend=StubBackend("vina-python", error=RuntimeError("bad receptor")))
+    engine.fallback = StubBackend("vina-subprocess", result=(-7.5, "POSES"))
+    logs = []
+    assert engine.run("REC", "LIG", log_callback=lambda m, t="info": logs.append(t)) == (-7.5, "POSES")
+    assert engine.fallback.calls == 1
+    assert logs == ["warn"]
+
+
+def test_failure_is_raised_without_a_runnable_fallback():
+    engine = VinaEngine(backend=StubBackend("vina-python", error=RuntimeError("bad receptor")))
+    engine.fallback = StubBackend("vina-subprocess", result=(-7.5, "POSES"), available=False)
+    with pytest.raises(RuntimeError):
+        engine.run("REC", "LIG")
+    assert engine.fallback.calls == 0
@@ -0,0 +1,108 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from engines import EngineUtils
+from evolution import EvolutionEngine
+
+AA3 = {'A': 'ALA', 'G': 'GLY', 'K': 'LYS', 'L': 'LEU', 'W': 'TRP', 'V': 'VAL'}
+
+
+def pdb_for(seq, chain="A", start=1, resname=None):
+    lines = []
+    for i, aa in enumerate(seq):
+        name = resname or AA3[aa]
+        lines.append(f"ATOM  {i + 1:>5}  CA  {name} {chain or ' '}{start + i:>4}    {i * 3.8:>8.3f}   0.000   0.000  1.00  0.00           C")
+    return "\n".join(lines)
+
+
+def test_mutation_codes_on_named_chain():
+    parent = pdb_for("KLVG", chain="B", start=10)
+    assert EngineUtils.derive_mutations(parent, "KLVG") == []
+    assert EngineUtils.derive_mutations(parent, "KWVA") == ["LB11W", "GB13A"]
+
+
+def test_blank_chain_codes_match_the_relabelled_file():
+    parent = pdb_for("KLVG", chain="")
+    assert EngineUtils.extract_residues(parent)[0][0] == ""
+    assert EngineUtils.derive_mutations(parent, "KWVG") == ["LA2W"]
+
+    filled = EngineUtils.fill_blank_chain(parent)
+    assert [r[0] for r in EngineUtils.extract_residues(filled)] == ["A"] * 4
+    assert EngineUtils.derive_mutations(filled, "KWVG") == ["LA2W"]
+
+
+def test_unmappable_sequences_are_rejected():
+    parent = pdb_for("KLVG")
+    assert EngineUtils.derive_mutations(parent, "KLV") is None
+    assert EngineUtils.derive_mutations(parent, "KLVGA") is None
+    assert EngineUtils.derive_mutations(parent, "KXVG") is None
+    assert EngineUtils.derive_mutations(pdb_for("KL", resname="MSE"), "KW") is None
+    assert EngineUtils.derive_mutations("", "K") is None
+
+
+def test_blank_and_a_chains_together_are_ambiguous():
+    parent = pdb_for("KL", chain="") + "\n" + pdb_for("VG", chain="A", start=3)
+    assert EngineUtils.derive_mutations(parent, "KLVA") is None
+
+
+class FakeFoldX:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.built = []
+
+    def build_model(self, parent, mutations, log_callback=None, repair=True):
+        self.built.append(mutations)
+        if self.fail:
+            raise Exception("BuildModel produced no model")
+        return "BUILT"
+
+
+class FakeFold:
+    def __init__(self):
+        self.folded = []
+
+    def fold(self, seq, log_callback=None):
+        self.folded.append(seq)
+        return "FOLDED"
+
+
+def make_engine(fail=False, threshold=2):
+    engine = EvolutionEngine(pdb_for("KLVG"), "LIGAND", mutation_threshold=threshold)
+    engine.foldx = FakeFoldX(fail)
+    engine.esmfold = FakeFold()
+    return engine
+
+
+def test_unchanged_sequence_reuses_the_parent():
+    engine = make_engine()
+    parent = pdb_for("KLVG")
+    assert engine._model_variant("KLVG", parent) == (parent, 'parent')
+
+
+def test_few_mutations_are_built_on_the_parent():
+    engine = make_engine()
+    assert engine._model_variant("KWVA", pdb_for("KLVG")) == ("BUILT", 'buildmodel')
+    assert engine.foldx.built == [["LA2W", "GA4A"]]
+    assert engine.esmfold.folded == []
+
+
+def test_many_mutations_or_unmappable_sequences_are_folded():
+    engine = make_engine()
+    assert engine._model_variant("WWWA", pdb_for("KLVG")) == ("FOLDED", 'esmfold')
+    assert engine._model_variant("KLVGA", pdb_for("KLVG")) == ("FOLDED", 'esmfold')
+    assert engine.foldx.built == []
+
+
+def test_threshold_zero_disables_buildmodel():
+    engine = make_engine(threshold=0)
+    assert engine._model_variant("KWVG", pdb_for("KLVG")) == ("FOLDED", 'esmfold')
+
+
+def test_buildmodel_failure_falls_back_to_esmfold():
+    engine = make_engine(fail=True)
+    logs = []
+    result = engine._model_variant("KWVG", pdb_for("KLVG"), lambda m, t='info': logs.append(t))
+    assert result == ("FOLDED", 'esmfold')
+    assert engine.foldx.built == [["LA2W"]]
+    assert 'warn' in logs
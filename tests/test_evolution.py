@@ -0,0 +1,216 @@
+import math
+import random
+
+import pytest
+
+pytest.importorskip("requests")
+
+from engines import EngineUtils
+from evolution import EvolutionEngine
+
+AA3 = {'A':'ALA','C':'CYS','D':'ASP','E':'GLU','F':'PHE','G':'GLY','H':'HIS','I':'ILE','K':'LYS','L':'LEU','M':'MET','N':'ASN','P':'PRO','Q':'GLN','R':'ARG','S':'SER','T':'THR','V':'VAL','W':'TRP','Y':'TYR'}
+PARENT = "MKTAYIAKQRQISFVKSHFSRQ"
+LIGAND = "HETATM    1  C   LIG A   1       0.000   0.000   0.000  1.00  0.00    +0.00 C "
+
+
+def pdb_for(seq):
+    lines = []
+    n = 1
+    for i, aa in enumerate(seq, 1):
+        for name, el, dx in (("N", "N", 0.0), ("CA", "C", 1.4), ("C", "C", 2.4), ("O", "O", 3.0)):
+            x, y, z = 10 * math.cos(i * 0.6) + dx * 0.2, 10 * math.sin(i * 0.6), i * 1.5
+            lines.append(f"ATOM  {n:>5}  {name:<3} {AA3[aa]} A{i:>4}    {x:>8.3f}{y:>8.3f}{z:>8.3f}  1.00  0.00           {el}")
+            n += 1
+    return "\n".join(lines)
+
+
+def seq_of(pdb):
+    return "".join(r[2] for r in EngineUtils.extract_residues(pdb))
+
+
+class FakeMPNN:
+    def __init__(self, seed=0, per_call=5, repeats=False):
+        self.rng = random.Random(seed)
+        self.per_call = per_call
+        self.repeats = repeats
+        self.calls = 0
+
+    def redesign(self, pdb, log_callback=None):
+        self.calls += 1
+        seq = seq_of(pdb)
+        out = []
+        for _ in range(self.per_call):
+            chars = list(seq)
+            for _ in range(self.rng.choice([1, 2, 8])):
+                chars[self.rng.randrange(len(chars))] = self.rng.choice("ACDEFGHIKLMNPQRSTVWY")
+            out.append(("".join(chars), "fake"))
+        if self.repeats:
+            # Local-fallback style: mostly the same design over and over
+            out = [out[0]] * (self.per_call - 1) + out[1:2]
+        return out
+
+
+class FakeFold:
+    def fold(self, seq, log_callback=None):
+        return pdb_for(seq)
+
+
+class FakeFoldX:
+    def build_model(self, parent, mutations, log_callback=None, repair=True):
+        seq = list(seq_of(parent))
+        for m in mutations:
+            seq[int(m[2:-1]) - 1] = m[-1]
+        return pdb_for("".join(seq))
+
+    def run_stability(self, pdb, log_callback=None, repair=True):
+        return -1.0
+
+
+class FakeVina:
+    available = True
+
+    def run(self, rec, lig, center, log_callback=None):
+        # Deterministic: more tryptophans dock better
+        return -5.0 - 0.1 * rec.count(" TRP "), LIGAND
+
+
+def make_engine(mpnn=None, **kwargs):
+    engine = EvolutionEngine(pdb_for(PARENT), LIGAND, **kwargs)
+    engine.mpnn = mpnn or FakeMPNN()
+    engine.esmfold = FakeFold()
+    engine.foldx = FakeFoldX()
+    engine.vina = FakeVina()
+    return engine
+
+
+def test_pool_is_filled_with_unique_designs():
+    mpnn = FakeMPNN(repeats=True)
+    engine = make_engine(mpnn=mpnn, variants=4)
+    results = engine.run_generation(0)
+    assert len(results) == 4
+    assert len({r["sequence"] for r in results}) == 4
+    # Two unique designs per call: needs more than the baseline's single top-up
+    assert mpnn.calls >= 2
+
+
+class BrokenVina:
+    available = True
+
+    def run(self, rec, lig, center, log_callback=None):
+        raise PermissionError("vina.exe is not executable here")
+
+
+def test_docking_failure_falls_back_to_contact_score():
+    pytest.importorskip("scipy")
+    engine = make_engine(variants=2)
+    engine.vina = BrokenVina()
+    results = engine.run_generation(0)
+    assert len(results) == 2
+    assert all(r["affinity_method"] == "contact" for r in results)
+    assert all(r["pose"] is None for r in results)
+
+
+def test_seed_from_vault_restores_pose_and_skips_other_methods(tmp_path):
+    from vault import DesignVault
+
+    vault = DesignVault(str(tmp_path / "designs.db"))
+    try:
+        engine = make_engine(vault=vault, run_id="old")
+        contact_best = dict(id="c", sequence=PARENT, affinity=-20.0, affinity_method="contact",
+                            pdb_data=pdb_for(PARENT), pose=None, center=None)
+        vina_best = dict(id="v", sequence=PARENT, affinity=-8.0, affinity_method="vina",
+                         pdb_data=pdb_for(PARENT), pose="POSE", center=(1.0, 2.0, 3.0))
+        for d in (contact_best, vina_best):
+            vault.add(d, run_id="old", ligand_key=engine.ligand_key)
+
+        seed = engine.seed_from_vault()
+        assert seed['id'] == "old:v"
+        assert engine.current_best_affinity == -8.0
+        assert engine.current_best_method == "vina"
+        assert engine.reference_pose == "POSE"
+        assert engine.reference_center == (1.0, 2.0, 3.0)
+    finally:
+        vault.close()
+
+
+def with_trp(*positions):
+    chars = list(PARENT)
+    for p in positions:
+        chars[p] = "W"
+    return "".join(chars)
+
+
+class ScriptedMPNN:
+    """
+    Returns the next scripted batch of designs per call (the parent's own
+    sequence with a suffix mutated otherwise) and records each parent.
+    """
+
+    def __init__(self, batches, gate=None):
+        self.batches = list(batches)
+        self.gate = gate
+        self.parents = []
+
+    def redesign(self, pdb, log_callback=None):
+        self.parents.append(seq_of(pdb))
+        if self.gate is not None and len(self.parents) > 1:
+            assert self.gate.wait(5)
+        if self.batches:
+            return [(s, "scripted") for s in self.batches.pop(0)]
+        seq = seq_of(pdb)
+        return [(seq[:-1] + aa, "scripted") for aa in "AGS"]
+
+
+def test_speculation_hit_is_reused():
+    # After two of three results the provisional best is the final best
+    batches = [[with_trp(1, 2, 3), with_trp(1), with_trp()[:-1] + "A"]]
+    mpnn = ScriptedMPNN(batches)
+    # Two generations, so generation 2 does not speculate in turn
+    engine = make_engine(mpnn=mpnn, variants=3, generations=2, pipeline=True)
+    try:
+        engine.run_generation(0)
+        assert engine.speculation_stats == {'hits': 1, 'misses': 0}
+
+        results = engine.run_generation(1)
+        # Generation 2 came from the speculative design, not a fresh call
+        assert mpnn.parents == [PARENT, with_trp(1, 2, 3)]
+        assert {r["sequence"][:-1] for r in results} == {with_trp(1, 2, 3)[:-1]}
+    finally:
+        engine.close()
+
+
+def test_speculation_miss_is_cancelled():
+    import threading
+
+    # The provisional best (one TRP) is overtaken by the last variant
+    batches = [[with_trp(1), with_trp()[:-1] + "A", with_trp(1, 2, 3)]]
+    gate = threading.Event()
+    mpnn = ScriptedMPNN(batches, gate=gate)
+    engine = make_engine(mpnn=mpnn, variants=3, generations=3, pipeline=True)
+    discarded = []
+    discard = engine._discard
+    engine._discard = lambda spec: (discarded.append(spec), discard(spec))
+    try:
+        engine.run_generation(0)
+        assert engine.speculation_stats == {'hits': 0, 'misses': 1}
+        assert seq_of(engine.current_best_pdb) == with_trp(1, 2, 3)
+        assert len(discarded) == 1 and discarded[0]['parent_id'] == "G1_V1"
+        gate.set()
+    finally:
+        engine.close()
+
+    # The speculation stopped at its next checkpoint instead of modelling
+    from evolution import _Cancelled
+    assert isinstance(discarded[0]['future'].exception(), _Cancelled)
+    assert mpnn.parents == [PARENT, with_trp(1)]
+
+
+def test_survivor_prefers_the_campaign_scoring_method():
+    engine = make_engine()
+    results = [
+        {'id': "a", 'affinity': -30.0, 'affinity_method': "contact"},
+        {'id': "b", 'affinity': -6.0, 'affinity_method': "vina"},
+        {'id': "c", 'affinity': -4.0, 'affinity_method': "vina"},
+    ]
+    assert engine.best_of(results)['id'] == "b"
+    assert engine.best_of(results[:1])['id'] == "a"
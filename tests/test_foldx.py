@@ -0,0 +1,72 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip("requests")
+
+from engines import FoldXEngine
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="stand-in FoldX is a shell script")
+
+STRUCTURE = "ATOM      1  CA  ALA A   1       0.000   0.000   0.000  1.00  0.00           C\n"
+
+
+def fake_foldx(tmp_path, fail=False):
+    """
+    Stand-in FoldX binary: RepairPDB appends a marker (or fails); every
+    invocation is counted in calls.log.
+    """
+    script = tmp_path / "bin" / "foldx"
+    script.parent.mkdir()
+    body = "exit 1" if fail else 'cp protein.pdb protein_Repair.pdb && echo "REMARK repaired" >> protein_Repair.pdb'
+    script.write_text(f'#!/bin/sh\necho "$1" >> "{tmp_path}/calls.log"\n{body}\n')
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+def calls(tmp_path):
+    log = tmp_path / "calls.log"
+    return log.read_text().split() if log.exists() else []
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_repeat_repair_is_served_from_memory(workdir):
+    foldx = FoldXEngine(fake_foldx(workdir))
+    repaired = foldx.repair(STRUCTURE)
+    assert repaired.endswith("REMARK repaired\n")
+    assert foldx.repair(STRUCTURE) == repaired
+    # The repaired structure is its own entry and is not repaired again
+    assert foldx.repair(repaired) == repaired
+    assert calls(workdir) == ["--command=RepairPDB"]
+    # Scoring-only repairs stay off disk
+    assert not os.path.exists(foldx.repair_cache_dir) or not os.listdir(foldx.repair_cache_dir)
+
+
+def test_persisted_parent_is_reused_from_disk(workdir):
+    binary = fake_foldx(workdir)
+    repaired = FoldXEngine(binary).repair(STRUCTURE, persist=True)
+    assert len(os.listdir(workdir / "cache" / "foldx_repair")) == 2
+
+    assert FoldXEngine(binary).repair(STRUCTURE) == repaired
+    assert calls(workdir) == ["--command=RepairPDB"]
+
+
+def test_failure_is_remembered(workdir):
+    foldx = FoldXEngine(fake_foldx(workdir, fail=True))
+    assert foldx.repair(STRUCTURE) == STRUCTURE
+    assert foldx.repair(STRUCTURE) == STRUCTURE
+    assert calls(workdir) == ["--command=RepairPDB"]
+
+
+def test_caches_are_bounded(workdir):
+    foldx = FoldXEngine(fake_foldx(workdir), repair_cache_size=3, repair_cache_files=4)
+    for i in range(5):
+        foldx.repair(STRUCTURE.replace("0.000", f"{i}.000", 1), persist=True)
+    assert len(foldx._repair_cache) == 3
+    assert len(os.listdir(foldx.repair_cache_dir)) == 4
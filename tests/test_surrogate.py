@@ -0,0 +1,67 @@
+import random
+
+from surrogate import SurrogateModel
+
+AA = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def _score(seq):
+    # Synthetic affinity: tryptophans help, prolines hurt
+    return -5.0 - 0.5 * seq.count("W") + 0.3 * seq.count("P")
+
+
+def _batch(rng, n=10, length=40):
+    return ["".join(rng.choice(AA) for _ in range(length)) for _ in range(n)]
+
+
+def test_untrained_select_keeps_order():
+    model = SurrogateModel(seed=0)
+    cands = [(s, "m") for s in _batch(random.Random(0), n=5)]
+    assert model.select(cands, 3) == cands[:3]
+    assert model.update([], []) is None
+
+
+def test_error_history_and_learning():
+    rng = random.Random(1)
+    model = SurrogateModel(seed=0)
+    for _ in range(10):
+        seqs = _batch(rng)
+        model.update(seqs, [_score(s) for s in seqs])
+
+    # First update is untrained, every later one records its batch error
+    assert len(model.error_history) == 9
+    assert all(e["mae"] >= 0 for e in model.error_history)
+
+    rich = "W" * 20 + "A" * 20
+    poor = "P" * 20 + "A" * 20
+    assert model.predict(rich) < model.predict(poor)
+
+
+def test_replay_buffer_is_bounded():
+    rng = random.Random(2)
+    model = SurrogateModel(seed=0, replay_size=15)
+    for _ in range(5):
+        seqs = _batch(rng)
+        model.update(seqs, [_score(s) for s in seqs])
+    assert model.n_seen == 50
+    assert len(model.replay) == 15
+
+
+def test_select_ranks_and_explores():
+    rng = random.Random(3)
+    model = SurrogateModel(seed=0)
+    for _ in range(8):
+        seqs = _batch(rng)
+        model.update(seqs, [_score(s) for s in seqs])
+
+    good = [("W" * 10 + s[10:], i) for i, s in enumerate(_batch(rng, n=4))]
+    bad = [("P" * 10 + s[10:], i) for i, s in enumerate(_batch(rng, n=16))]
+    pool = bad + good
+
+    chosen = model.select(pool, 5, explore_fraction=0.2)
+    assert len(chosen) == 5
+    assert len({c[0] for c in chosen}) == 5
+    # 4 exploitation slots go to the best-predicted designs, 1 is exploration
+    assert set(good) <= set(chosen)
+
+    assert set(model.select(pool, 5, explore_fraction=0.0)) == set(good) | {min(bad, key=lambda c: model.predict(c[0]))}
@@ -0,0 +1,82 @@
+import random
+import sqlite3
+
+import pytest
+
+from vault import DesignVault
+
+AA = "ACDEFGHIKLMNPQRSTVWY"
+
+
+@pytest.fixture
+def vault(tmp_path):
+    v = DesignVault(str(tmp_path / "designs.db"))
+    yield v
+    v.close()
+
+
+def mutate(rng, seq, n):
+    chars = list(seq)
+    for _ in range(n):
+        chars[rng.randrange(len(chars))] = rng.choice(AA)
+    return "".join(chars)
+
+
+def jaccard(vault, a, b):
+    ka, kb = vault.kmers(a), vault.kmers(b)
+    return len(ka & kb) / len(ka | kb)
+
+
+def test_nearest_matches_brute_force_jaccard(vault):
+    rng = random.Random(7)
+    base = "".join(rng.choice(AA) for _ in range(60))
+    stored = {}
+    for i in range(300):
+        seq = mutate(rng, base, rng.choice([0, 1, 2, 4, 8, 20]))
+        stored[vault.add({'id': f"v{i}", 'sequence': seq, 'affinity': -rng.random()}, run_id="r")] = seq
+
+    for trial in range(20):
+        query = mutate(rng, base, rng.choice([1, 3, 6]))
+        for threshold in (0.3, 0.6, 0.9):
+            expected = {d for d, seq in stored.items() if jaccard(vault, query, seq) >= threshold}
+            found = vault.nearest(query, limit=len(stored), min_similarity=threshold)
+            assert {d['id'] for d in found} == expected
+            for d in found:
+                assert d['similarity'] == pytest.approx(jaccard(vault, query, stored[d['id']]))
+
+
+def test_reads_filter_on_affinity_method(vault):
+    seq = "MKTAYIAKQRQISFVKSHFSRQ"
+    vault.add({'id': "a", 'sequence': seq, 'affinity': -12.0, 'affinity_method': 'contact', 'pdb_data': "ATOM"}, ligand_key="L")
+    vault.add({'id': "b", 'sequence': seq, 'affinity': -7.0, 'affinity_method': 'vina', 'pdb_data': "ATOM",
+               'pose': "HETATM", 'center': (1.0, 2.0, 3.0)}, ligand_key="L")
+
+    assert [d['id'] for d in vault.best(ligand_key="L", affinity_method="vina")] == ["b"]
+    assert vault.lookup(seq, ligand_key="L", affinity_method="vina")['id'] == "b"
+    assert [d['id'] for d in vault.nearest(seq, affinity_method="contact")] == ["a"]
+
+    seed = vault.seeds(seq, ligand_key="L", affinity_method="vina")[0]
+    assert seed['pose'] == "HETATM"
+    assert seed['center'] == (1.0, 2.0, 3.0)
+
+
+def test_old_vault_is_migrated(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE designs (pk INTEGER PRIMARY KEY AUTOINCREMENT, design_id TEXT UNIQUE, run_id TEXT, "
+        "ligand_key TEXT, generation INTEGER, parent_id TEXT, sequence TEXT, mutations TEXT, affinity REAL, "
+        "stability REAL, n_kmers INTEGER, pdb BLOB, created_at REAL)"
+    )
+    conn.execute("INSERT INTO designs (design_id, sequence, affinity) VALUES ('old', 'MKTAYIAKQ', -5.0)")
+    conn.commit()
+    conn.close()
+
+    v = DesignVault(str(path))
+    try:
+        assert v.get("old")['affinity_method'] is None
+        assert v.best(affinity_method="vina") == []
+        v.add({'id': "new", 'sequence': "MKTAYIAKQ", 'affinity': -6.0, 'affinity_method': 'vina'})
+        assert [d['id'] for d in v.best(affinity_method="vina")] == ["new"]
+    finally:
+        v.close()
@@ -0,0 +1,132 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("requests")
+
+from vis_connector import ChimeraXConnector
+
+
+class FakeChimeraX:
+    """
+    Stand-in for ChimeraX's REST server: records every command, tracks
+    open models, and can hold 'open' requests until released.
+    """
+
+    def __init__(self, models=None):
+        self.commands = []
+        self.models = dict(models or {})
+        self.release = threading.Event()
+        self.release.set()
+        self.opening = threading.Event()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                command = parse_qs(urlparse(self.path).query)["command"][0]
+                fake.commands.append(command)
+                reply = "ok"
+                if command.startswith("open"):
+                    fake.opening.set()
+                    fake.release.wait(10)
+                    model = max(fake.models, default=0) + 1
+                    fake.models[model] = command.split('"')[1]
+                    reply = f"Opened {fake.models[model]} as #{model}"
+                elif command == "close":
+                    fake.models.clear()
+                elif command.startswith("close "):
+                    for spec in command.split()[1:]:
+                        fake.models.pop(int(spec.lstrip("#")), None)
+                elif command == "info models":
+                    reply = "\n".join(f"model id #{m} type AtomicStructure name {n}" for m, n in fake.models.items())
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(reply.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def chimerax():
+    fake = FakeChimeraX()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def structures(tmp_path):
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"s{i}.pdb"
+        p.write_text("END\n")
+        paths.append(str(p))
+    return paths
+
+
+def test_push_sends_version_close_open_view(chimerax, structures):
+    conn = ChimeraXConnector(port=chimerax.port, launch=False)
+    assert conn.open_structure(structures[0])
+    assert conn.wait_idle(5)
+    assert chimerax.commands == ["version", "info models", f'open "{structures[0]}"', "info models", "view"]
+    assert conn.pushed == 1 and conn.coalesced == 0
+    conn.close()
+
+
+def test_structures_arriving_while_busy_are_coalesced(chimerax, structures):
+    conn = ChimeraXConnector(port=chimerax.port, launch=False)
+    chimerax.release.clear()
+    conn.open_structure(structures[0])
+    assert chimerax.opening.wait(5)
+    for path in structures[1:]:
+        conn.open_structure(path)
+    chimerax.release.set()
+    assert conn.wait_idle(5)
+
+    opened = [c for c in chimerax.commands if c.startswith("open")]
+    assert opened == [f'open "{structures[0]}"', f'open "{structures[-1]}"']
+    assert conn.pushed == 2
+    assert conn.coalesced == 2
+    conn.close()
+
+
+def test_open_after_close_restarts_the_worker(chimerax, structures):
+    conn = ChimeraXConnector(port=chimerax.port, launch=False)
+    chimerax.release.clear()
+    conn.open_structure(structures[0])
+    assert chimerax.opening.wait(5)
+    # Close while the worker is mid-push, then queue another structure
+    conn.close()
+    conn.open_structure(structures[1])
+    chimerax.release.set()
+    assert conn.wait_idle(5)
+    assert f'open "{structures[1]}"' in chimerax.commands
+    conn.close()
+
+
+def test_only_the_connectors_own_model_is_closed(structures):
+    fake = FakeChimeraX(models={1: "users_model.pdb"})
+    try:
+        conn = ChimeraXConnector(port=fake.port, launch=False)
+        conn.open_structure(structures[0])
+        assert conn.wait_idle(5)
+        conn.open_structure(structures[1])
+        assert conn.wait_idle(5)
+
+        closes = [c for c in fake.commands if c.startswith("close")]
+        assert closes == ["close #2"]
+        assert fake.models == {1: "users_model.pdb", 2: structures[1]}
+        conn.close()
+    finally:
+        fake.stop()
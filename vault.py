@@ -0,0 +1,312 @@
+import os
+import math
+import time
+import zlib
+import json
+import hashlib
+import sqlite3
+import threading
+
+AA_ALPHABET = "ACDEFGHIKLMNPQRSTVWYX"
+
+
+class DesignVault:
+    """
+    Persistent store of every evaluated design (scores, lineage, structure),
+    the Python counterpart of the legacy IndexedDB "Learn" vault.
+
+    Similarity search uses a k-mer inverted index with prefix filtering:
+    for a Jaccard threshold t only the rarest |q| - ceil(t*|q|) + 1 query
+    k-mers need probing, so near-duplicate lookups touch a few short
+    postings lists instead of scanning the vault.
+
+    Affinities are only comparable between designs scored by the same
+    method ('vina' or 'contact'); the read methods take an affinity_method
+    filter for that. Rows written before the column existed have none.
+    """
+
+    def __init__(self, path="vault/designs.db", k=5):
+        self.path = os.path.abspath(path)
+        self.k = k
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Shared by the evolution worker threads; sqlite calls are serialised
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self.conn:
+            self.conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS designs (
+                    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+                    design_id TEXT UNIQUE,
+                    run_id TEXT,
+                    ligand_key TEXT,
+                    generation INTEGER,
+                    parent_id TEXT,
+                    sequence TEXT,
+                    mutations TEXT,
+                    affinity REAL,
+                    affinity_method TEXT,
+                    stability REAL,
+                    n_kmers INTEGER,
+                    pdb BLOB,
+                    pose BLOB,
+                    center TEXT,
+                    created_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_designs_sequence ON designs(sequence);
+                CREATE INDEX IF NOT EXISTS idx_designs_affinity ON designs(ligand_key, affinity);
+                CREATE TABLE IF NOT EXISTS kmers (
+                    kmer INTEGER,
+                    design INTEGER,
+                    PRIMARY KEY (kmer, design)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_kmers_design ON kmers(design);
+                CREATE TABLE IF NOT EXISTS kmer_df (
+                    kmer INTEGER PRIMARY KEY,
+                    df INTEGER
+                );
+            """)
+            # Vaults created before scores were tagged by method
+            columns = {r['name'] for r in self.conn.execute("PRAGMA table_info(designs)")}
+            for name, kind in (("affinity_method", "TEXT"), ("pose", "BLOB"), ("center", "TEXT")):
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE designs ADD COLUMN {name} {kind}")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_designs_method ON designs(ligand_key, affinity_method, affinity)"
+            )
+
+    @staticmethod
+    def ligand_key(ligand_pdbqt):
+        """
+        Scores are only comparable for the same ligand; designs are grouped by this key.
+        """
+        return hashlib.sha1(ligand_pdbqt.encode()).hexdigest()
+
+    def kmers(self, sequence):
+        """
+        Distinct k-mers of a sequence, base-21 encoded as integers.
+        """
+        codes = [AA_ALPHABET.find(c) if c in AA_ALPHABET else 20 for c in sequence.upper()]
+        out = set()
+        for i in range(len(codes) - self.k + 1):
+            code = 0
+            for c in codes[i:i+self.k]:
+                code = code * 21 + c
+            out.add(code)
+        return out
+
+    # --- Writes ---
+
+    def add(self, design, run_id=None, ligand_key=None, parent_id=None):
+        """
+        Stores an evaluated design (a run_generation result dict). The docked
+        pose and pocket centre are kept only alongside a stored structure.
+        Returns the vault id ("<run_id>:<id>").
+        """
+        design_id = f"{run_id}:{design['id']}" if run_id else design['id']
+        kmers = self.kmers(design['sequence'])
+        pdb = design.get('pdb_data')
+        pose = design.get('pose') if pdb else None
+        center = design.get('center') if pose else None
+
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT pk FROM designs WHERE design_id = ?", (design_id,)).fetchone()
+            if old:
+                self._remove_pk(old['pk'])
+
+            cur = self.conn.execute(
+                "INSERT INTO designs (design_id, run_id, ligand_key, generation, parent_id, sequence, mutations, "
+                "affinity, affinity_method, stability, n_kmers, pdb, pose, center, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (design_id, run_id, ligand_key, design.get('generation'), parent_id, design['sequence'],
+                 json.dumps(design.get('mutations')), design.get('affinity'), design.get('affinity_method'),
+                 design.get('stability'), len(kmers), zlib.compress(pdb.encode()) if pdb else None,
+                 zlib.compress(pose.encode()) if pose else None, json.dumps(list(center)) if center else None,
+                 time.time())
+            )
+            pk = cur.lastrowid
+            self.conn.executemany("INSERT INTO kmers (kmer, design) VALUES (?, ?)", [(km, pk) for km in kmers])
+            self.conn.executemany(
+                "INSERT INTO kmer_df (kmer, df) VALUES (?, 1) ON CONFLICT(kmer) DO UPDATE SET df = df + 1",
+                [(km,) for km in kmers]
+            )
+        return design_id
+
+    def _remove_pk(self, pk):
+        kmers = [r['kmer'] for r in self.conn.execute("SELECT kmer FROM kmers WHERE design = ?", (pk,))]
+        self.conn.executemany("UPDATE kmer_df SET df = df - 1 WHERE kmer = ?", [(km,) for km in kmers])
+        self.conn.execute("DELETE FROM kmers WHERE design = ?", (pk,))
+        self.conn.execute("DELETE FROM designs WHERE pk = ?", (pk,))
+
+    def delete(self, design_id):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT pk FROM designs WHERE design_id = ?", (design_id,)).fetchone()
+            if row: self._remove_pk(row['pk'])
+
+    # --- Reads ---
+
+    def _to_dict(self, row, with_pdb=False):
+        d = {
+            'id': row['design_id'],
+            'run_id': row['run_id'],
+            'ligand_key': row['ligand_key'],
+            'generation': row['generation'],
+            'parent_id': row['parent_id'],
+            'sequence': row['sequence'],
+            'mutations': json.loads(row['mutations']) if row['mutations'] else None,
+            'affinity': row['affinity'],
+            'affinity_method': row['affinity_method'],
+            'stability': row['stability'],
+        }
+        if with_pdb:
+            d['pdb_data'] = zlib.decompress(row['pdb']).decode() if row['pdb'] else None
+            d['pose'] = zlib.decompress(row['pose']).decode() if row['pose'] else None
+            d['center'] = tuple(json.loads(row['center'])) if row['center'] else None
+        return d
+
+    def get(self, design_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM designs WHERE design_id = ?", (design_id,)).fetchone()
+        return self._to_dict(row, with_pdb=True) if row else None
+
+    def lookup(self, sequence, ligand_key=None, affinity_method=None):
+        """
+        Best-scoring stored design with exactly this sequence, or None.
+        """
+        sql = "SELECT * FROM designs WHERE sequence = ?"
+        args = [sequence]
+        sql, args = self._filter(sql, args, ligand_key, affinity_method)
+        sql += " ORDER BY affinity LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(sql, args).fetchone()
+        return self._to_dict(row) if row else None
+
+    def nearest(self, sequence, limit=10, min_similarity=0.5, ligand_key=None, affinity_method=None):
+        """
+        Designs whose k-mer Jaccard similarity to sequence is >= min_similarity,
+        most similar first. Each dict carries a 'similarity' field.
+        """
+        query = self.kmers(sequence)
+        if not query: return []
+        min_similarity = max(min_similarity, 1e-6)
+
+        with self._lock:
+            # 1. Prefix filter: probe only the rarest k-mers (unseen ones
+            # count towards the prefix but have empty postings)
+            df = dict(self._chunked(
+                "SELECT kmer, df FROM kmer_df WHERE kmer IN ({}) AND df > 0", list(query)
+            ))
+            min_overlap = math.ceil(min_similarity * len(query))
+            n_probe = len(query) - min_overlap + 1
+            probe = [km for km in sorted(query, key=lambda km: df.get(km, 0))[:n_probe] if km in df]
+            if not probe: return []
+
+            candidates = {r[0] for r in self._chunked("SELECT DISTINCT design FROM kmers WHERE kmer IN ({})", probe)}
+            if not candidates: return []
+
+            # 2. Verify: exact overlap per candidate
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS _q (kmer INTEGER PRIMARY KEY)")
+            self.conn.execute("DELETE FROM _q")
+            self.conn.executemany("INSERT INTO _q (kmer) VALUES (?)", [(km,) for km in query])
+
+            scored = []
+            for design, shared in self._chunked(
+                "SELECT k.design, COUNT(*) FROM kmers k JOIN _q ON _q.kmer = k.kmer "
+                "WHERE k.design IN ({}) GROUP BY k.design", list(candidates)
+            ):
+                scored.append((design, shared))
+
+            rows = {r['pk']: r for r in self._chunked(
+                "SELECT * FROM designs WHERE pk IN ({})", [d for d, _ in scored]
+            )}
+
+        out = []
+        for design, shared in scored:
+            row = rows.get(design)
+            if row is None or (ligand_key and row['ligand_key'] != ligand_key): continue
+            if affinity_method and row['affinity_method'] != affinity_method: continue
+            similarity = shared / (len(query) + row['n_kmers'] - shared)
+            if similarity < min_similarity: continue
+            d = self._to_dict(row)
+            d['similarity'] = similarity
+            out.append(d)
+
+        out.sort(key=lambda d: (-d['similarity'], d['affinity'] if d['affinity'] is not None else float('inf')))
+        return out[:limit]
+
+    def seeds(self, sequence, limit=5, min_similarity=0.5, ligand_key=None, affinity_method=None):
+        """
+        Nearest prior designs that have a stored structure, ranked by
+        affinity (best first). Returned dicts include pdb_data, pose and center.
+        """
+        near = self.nearest(sequence, limit=max(limit * 10, 50), min_similarity=min_similarity,
+                            ligand_key=ligand_key, affinity_method=affinity_method)
+        near = [d for d in near if d['affinity'] is not None]
+        near.sort(key=lambda d: d['affinity'])
+        out = []
+        for d in near:
+            full = self.get(d['id'])
+            if not full['pdb_data']: continue
+            full['similarity'] = d['similarity']
+            out.append(full)
+            if len(out) >= limit: break
+        return out
+
+    def best(self, limit=10, ligand_key=None, affinity_method=None):
+        sql = "SELECT * FROM designs WHERE affinity IS NOT NULL"
+        sql, args = self._filter(sql, [], ligand_key, affinity_method)
+        sql += " ORDER BY affinity LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [self._to_dict(r) for r in self.conn.execute(sql, args)]
+
+    def lineage(self, design_id):
+        """
+        [design, parent, grandparent, ...] as far back as the vault knows.
+        """
+        chain = []
+        seen = set()
+        while design_id and design_id not in seen:
+            seen.add(design_id)
+            d = self.get(design_id)
+            if d is None: break
+            chain.append(d)
+            design_id = d['parent_id']
+        return chain
+
+    def stats(self):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) AS n, COUNT(DISTINCT run_id) AS runs, MIN(affinity) AS best, "
+                "AVG(CASE WHEN stability < 0 THEN 1.0 ELSE 0.0 END) AS pass_rate FROM designs"
+            ).fetchone()
+        return {
+            'totalDesigns': row['n'],
+            'runs': row['runs'],
+            'bestAffinity': row['best'],
+            'passRate': row['pass_rate'] or 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _filter(sql, args, ligand_key=None, affinity_method=None):
+        if ligand_key:
+            sql += " AND ligand_key = ?"
+            args.append(ligand_key)
+        if affinity_method:
+            sql += " AND affinity_method = ?"
+            args.append(affinity_method)
+        return sql, args
+
+    def _chunked(self, sql, values, size=900):
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(values), size):
+            chunk = values[i:i+size]
+            yield from self.conn.execute(sql.format(",".join("?" * len(chunk))), chunk)
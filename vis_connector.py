@@ -1,9 +1,20 @@
 import os
+import re
+import time
 import subprocess
 import shutil
+import threading
+import requests
 
 class ChimeraXConnector:
-    def __init__(self):
+    """
+    Drives a single ChimeraX session through its REST remote-control
+    interface (`remotecontrol rest start`). The session is attached to if
+    already listening, otherwise launched once. Structures are pushed from a
+    background thread; if several arrive while ChimeraX is busy, only the
+    latest is opened.
+    """
+    def __init__(self, host="127.0.0.1", port=60100, launch=True, replace=True, timeout=10, startup_timeout=60):
         # Known paths
         self.paths = [
             r"C:\Program Files\ChimeraX 1.10.1\bin\ChimeraX.exe",
@@ -11,7 +22,30 @@ class ChimeraXConnector:
             r"C:\Users\user\AppData\Local\Programs\ChimeraX\bin\ChimeraX.exe"
         ]
         self.binary = self._find_binary()
-    
+
+        self.base_url = f"http://{host}:{port}"
+        self.port = port
+        self.launch = launch
+        # Close the previous structure before opening the next, so a long
+        # run does not accumulate models (and memory) in the session. Only
+        # models this connector opened are closed; the session may be the
+        # user's own.
+        self.replace = replace
+        self._models = []
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+        self._pending = None
+        self._cond = threading.Condition()
+        self._worker = None
+        # Each worker has its own stop event, so close() followed by
+        # open_structure() starts a fresh worker instead of racing the old one
+        self._stop = None
+        self._pushing = 0
+        self.pushed = 0
+        self.coalesced = 0
+
     def _find_binary(self):
         for p in self.paths:
             if os.path.exists(p):
@@ -19,23 +53,126 @@ class ChimeraXConnector:
         # Try finding in PATH
         return shutil.which("ChimeraX") or shutil.which("chimerax")
 
-    def open_structure(self, pdb_path):
+    def run_command(self, command):
+        """
+        Executes a ChimeraX command in the session and returns its text output.
+        """
+        resp = requests.get(f"{self.base_url}/run", params={"command": command}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.text
+
+    def is_connected(self):
+        try:
+            self.run_command("version")
+            return True
+        except requests.RequestException:
+            return False
+
+    def ensure_session(self):
         """
-        Launches ChimeraX with the given PDB file.
-        Returns True if successful.
+        Attaches to a listening ChimeraX, or launches one with REST enabled.
+        Returns True once the session answers.
         """
-        if not self.binary:
-            print("Warning: ChimeraX binary not found.")
+        if self.is_connected():
+            return True
+
+        if not self.launch:
+            print(f"Warning: No ChimeraX session at {self.base_url}.")
             return False
-            
+
+        if self.process is None or self.process.poll() is not None:
+            if not self.binary:
+                print("Warning: ChimeraX binary not found.")
+                return False
+            try:
+                self.process = subprocess.Popen([self.binary, "--cmd", f"remotecontrol rest start port {self.port}"])
+            except Exception as e:
+                print(f"Error launching ChimeraX: {e}")
+                return False
+
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.is_connected():
+                return True
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.5)
+
+        print("Warning: ChimeraX did not start its REST server in time.")
+        return False
+
+    def open_structure(self, pdb_path):
+        """
+        Queues pdb_path to be shown in the shared ChimeraX session.
+        Returns immediately; True if the structure was queued.
+        """
         if not os.path.exists(pdb_path):
              print(f"Warning: Structure file not found: {pdb_path}")
              return False
-             
-        try:
-            # We launch detached to not block the Python script
-            subprocess.Popen([self.binary, pdb_path])
-            return True
-        except Exception as e:
-            print(f"Error launching ChimeraX: {e}")
+
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = os.path.abspath(pdb_path)
+            if self._worker is None or not self._worker.is_alive():
+                self._stop = threading.Event()
+                self._worker = threading.Thread(target=self._push_loop, args=(self._stop,), daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+        return True
+
+    def _push_loop(self, stop):
+        while True:
+            with self._cond:
+                while self._pending is None and not stop.is_set():
+                    self._cond.wait()
+                if stop.is_set():
+                    return
+                pdb_path, self._pending = self._pending, None
+                self._pushing += 1
+
+            try:
+                self._push(pdb_path)
+            except Exception as e:
+                print(f"Error sending structure to ChimeraX: {e}")
+            finally:
+                with self._cond:
+                    self._pushing -= 1
+                    self._cond.notify_all()
+
+    def model_ids(self):
+        """
+        Top-level model ids currently in the session.
+        """
+        return {int(m) for m in re.findall(r"#(\d+)", self.run_command("info models"))}
+
+    def _push(self, pdb_path):
+        if not self.ensure_session():
             return False
+
+        if self.replace and self._models:
+            self.run_command("close " + " ".join(f"#{m}" for m in self._models))
+            self._models = []
+        before = self.model_ids()
+        self.run_command(f'open "{pdb_path}"')
+        self._models = sorted(self.model_ids() - before)
+        self.run_command("view")
+        self.pushed += 1
+        return True
+
+    def wait_idle(self, timeout=None):
+        """
+        Blocks until queued structures have been pushed. Returns True if idle.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._pushing, timeout)
+
+    def close(self):
+        """
+        Stops the push thread. The ChimeraX window is left open for the user.
+        """
+        with self._cond:
+            if self._stop is not None:
+                self._stop.set()
+            self._worker = None
+            self._cond.notify_all()